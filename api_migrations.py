@@ -0,0 +1,52 @@
+import logging
+from sqlalchemy import inspect, text
+from models import db
+
+logger = logging.getLogger(__name__)
+
+def missing_columns(inspector, table):
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    return [column for column in table.columns if column.name not in existing]
+
+def migrate():
+    """Bring API tables created by an older version up to the models in models.py.
+
+    db.create_all() creates missing tables but never changes existing ones, so
+    columns and indexes added to a model later are added here. The Streamlit
+    migrations keep their version in PRAGMA user_version of the same database
+    file, so instead of a version number each table is compared with its model.
+    Only additive changes are made: new columns are added as nullable columns
+    without constraints, and tables with another primary key are skipped. Call
+    after db.create_all() inside an app context; returns a description of every
+    change applied.
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    dialect = db.engine.dialect
+    applied = []
+
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            # The Streamlit app's users and student_profiles share these names in the default database
+            # file; a table keyed differently belongs to that schema and is left alone
+            primary_key = inspector.get_pk_constraint(table.name)['constrained_columns']
+            if primary_key != [column.name for column in table.primary_key.columns]:
+                logger.warning(f"Table {table.name} has primary key {primary_key}, not the API model's - not migrated")
+                continue
+            for column in missing_columns(inspector, table):
+                conn.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=dialect)}'
+                ))
+                applied.append(f'added column {table.name}.{column.name}')
+
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    applied.append(f'created index {index.name}')
+
+    for change in applied:
+        logger.info(f"API schema migration: {change}")
+    return applied
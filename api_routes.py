@@ -1,13 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
 import pandas as pd
 import pickle
 import logging
+import os
 import json
 from sqlalchemy import and_, or_, func
-import numpy as np
-from models import db, User, StudentProfile
+from models import db, User, StudentProfile, PredictionJob
+from model.scoring import PERFORMANCE_LABELS, profiles_to_columns, score_batch
+from model.forest import MODEL_DIR
+from model.registry import registry, load_version
+from model.sweep import validate_sweep, run_sweep
+from prediction_service import (
+    load_profiles, get_student_prediction, invalidate_students, find_paths_to_passing, path_to_dict,
+    explain_profiles, shadow_copy,
+    batcher, prediction_cache, shadow
+)
+from prediction_jobs import JOB_MODES, validate_filters, submit_job, job_to_dict, get_job_results
+from drift_monitor import profile_values, record_profiles, record_update, drift_report
 from functools import wraps
 
 # Create blueprint for API routes
@@ -30,10 +40,8 @@ def role_required(allowed_roles):
         return wrapper
     return decorator
 
-# Load the trained model
-# Temporarily disabled due to pickle compatibility issues
-model = None
-logger.warning("ML model temporarily disabled - using mock predictions")
+# Number of prediction records serialized per streamed response chunk
+STREAM_CHUNK_SIZE = 1000
 
 # Student Management Routes
 @api.route('/students', methods=['GET'])
@@ -202,6 +210,7 @@ def create_student():
         )
         
         db.session.add(student)
+        record_profiles([student])
         db.session.commit()
         
         return jsonify({
@@ -236,11 +245,14 @@ def update_student(student_id):
             'parental_education_level', 'distance_from_home'
         ]
         
+        before = profile_values(student)
         for field in allowed_fields:
             if field in data:
                 setattr(student, field, data[field])
         
+        record_update(before, student)
         db.session.commit()
+        invalidate_students([student_id])
         
         return jsonify({'message': 'Student updated successfully'}), 200
         
@@ -259,8 +271,10 @@ def delete_student(student_id):
         if not student:
             return jsonify({'error': 'Student not found'}), 404
         
+        record_profiles([student], -1)
         db.session.delete(student)
         db.session.commit()
+        invalidate_students([student_id])
         
         return jsonify({'message': 'Student deleted successfully'}), 200
         
@@ -292,30 +306,141 @@ def get_prediction(student_id):
             if not student_profile:
                 return jsonify({'error': 'Student not found'}), 404
         
-        # Mock prediction since model is disabled
-        import random
+        # Served from the prediction cache unless the profile or model changed
+        return jsonify(get_student_prediction(student_profile)), 200
         
-        # Generate a realistic mock prediction based on student data
-        base_score = student_profile.previous_scores or 75
-        attendance_factor = (student_profile.attendance or 80) / 100.0
-        study_factor = min((student_profile.hours_studied or 20) / 40.0, 1.0)
+    except Exception as e:
+        logger.error(f"Get prediction error: {e}")
+        return jsonify({'error': 'Failed to generate prediction'}), 500
+
+@api.route('/predictions/metrics', methods=['GET'])
+@jwt_required()
+@role_required(['administrator'])
+def get_prediction_metrics():
+    """Micro-batching and prediction cache metrics, for tuning the batch window"""
+    return jsonify({
+        'batcher': batcher.stats(),
+        'cache': prediction_cache.stats()
+    }), 200
+
+@api.route('/predictions/<student_id>/explanation', methods=['GET'])
+@jwt_required()
+@role_required(['student', 'teacher', 'administrator'])
+def get_prediction_explanation(student_id):
+    """Explain a student's prediction as per-feature contributions"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        # Check permissions
+        if current_user.role == 'student':
+            student_profile = StudentProfile.query.filter_by(
+                student_id=student_id,
+                user_id=current_user_id
+            ).first()
+            if not student_profile:
+                return jsonify({'error': 'Access denied'}), 403
+        else:
+            student_profile = StudentProfile.query.get(student_id)
+            if not student_profile:
+                return jsonify({'error': 'Student not found'}), 404
+        
+        model = registry.get()
+        if model.is_mock:
+            return jsonify({'error': 'Explanations need the exported models'}), 503
         
-        # Calculate mock prediction
-        prediction = base_score * 0.6 + attendance_factor * 20 + study_factor * 15
-        prediction = max(0, min(100, prediction + random.uniform(-5, 5)))  # Add some randomness
-        confidence = 0.75 + random.uniform(0, 0.2)  # Mock confidence
+        top = request.args.get('top', type=int)
+        result = explain_profiles([student_profile], model, top)[0]
+        result['model_version'] = model.version
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Prediction explanation error: {e}")
+        return jsonify({'error': 'Failed to explain prediction'}), 500
+
+@api.route('/predictions/<student_id>/sweep', methods=['POST'])
+@jwt_required()
+@role_required(['student', 'teacher', 'administrator'])
+def sweep_prediction(student_id):
+    """Predict a student's response surface over one or two feature grids in one model call"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
         
+        # Check permissions
+        if current_user.role == 'student':
+            student_profile = StudentProfile.query.filter_by(
+                student_id=student_id,
+                user_id=current_user_id
+            ).first()
+            if not student_profile:
+                return jsonify({'error': 'Access denied'}), 403
+        else:
+            student_profile = StudentProfile.query.get(student_id)
+            if not student_profile:
+                return jsonify({'error': 'Student not found'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        sweeps = data.get('sweep', [])
+        if not isinstance(sweeps, list) or not all(isinstance(item, dict) for item in sweeps):
+            return jsonify({'error': 'sweep must be a list of {"feature", "values"} objects'}), 400
+        grids = [(item.get('feature'), item.get('values')) for item in sweeps]
+        
+        model = registry.get()
+        if model.is_mock:
+            return jsonify({'error': 'Prediction sweeps need the exported models'}), 503
+        
+        error = validate_sweep(grids, model.models[0])
+        if error:
+            return jsonify({'error': error}), 400
+        
+        base = {column: values[0] for column, values in profiles_to_columns([student_profile]).items()}
+        result = run_sweep(base, grids, model.models)
+        result['student_id'] = student_id
+        result['model_version'] = model.version
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Sweep prediction error: {e}")
+        return jsonify({'error': 'Failed to run prediction sweep'}), 500
+
+@api.route('/predictions/<student_id>/path-to-passing', methods=['GET'])
+@jwt_required()
+@role_required(['student', 'teacher', 'administrator'])
+def get_path_to_passing(student_id):
+    """Cheapest changes to study hours, attendance, tutoring and sleep that lift a student out of At Risk"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        # Check permissions
+        if current_user.role == 'student':
+            student_profile = StudentProfile.query.filter_by(
+                student_id=student_id,
+                user_id=current_user_id
+            ).first()
+            if not student_profile:
+                return jsonify({'error': 'Access denied'}), 403
+        else:
+            student_profile = StudentProfile.query.get(student_id)
+            if not student_profile:
+                return jsonify({'error': 'Student not found'}), 404
+        
+        model = registry.get()
+        if model.is_mock:
+            return jsonify({'error': 'Path to passing needs the exported models'}), 503
+        
+        paths = find_paths_to_passing([student_profile], model)[0]
         return jsonify({
             'student_id': student_id,
-            'predicted_score': float(prediction),
-            'confidence_level': confidence,
-            'prediction_date': datetime.utcnow().isoformat(),
-            'model_version': 'v1.0'
+            'model_version': model.version,
+            'at_risk': paths is not None,
+            'paths': [path_to_dict(path) for path in paths or []]
         }), 200
         
     except Exception as e:
-        logger.error(f"Get prediction error: {e}")
-        return jsonify({'error': 'Failed to generate prediction'}), 500
+        logger.error(f"Path to passing error: {e}")
+        return jsonify({'error': 'Failed to search path to passing'}), 500
 
 @api.route('/predictions/batch', methods=['POST'])
 @jwt_required()
@@ -329,39 +454,192 @@ def batch_predictions():
         if not student_ids:
             return jsonify({'error': 'No student IDs provided'}), 400
         
-        # Mock predictions since model is disabled
-        import random
+        # Load every requested profile up front and score them as one matrix
+        profiles = load_profiles(student_ids)
+        model = registry.get()
+        columns = profiles_to_columns(profiles)
+        predicted_scores, confidence, categories = score_batch(columns, model.models)
+        shadow_copy(columns, predicted_scores, categories, model)
+        
+        def generate():
+            yield '{"predictions": ['
+            for start in range(0, len(profiles), STREAM_CHUNK_SIZE):
+                chunk = []
+                for index in range(start, min(start + STREAM_CHUNK_SIZE, len(profiles))):
+                    student = profiles[index]
+                    chunk.append(json.dumps({
+                        'student_id': student.student_id,
+                        'student_name': f"{student.first_name} {student.last_name}",
+                        'predicted_score': float(predicted_scores[index]),
+                        'confidence_level': float(confidence[index]),
+                        'performance_category': PERFORMANCE_LABELS[int(categories[index])]
+                    }))
+                yield (',' if start else '') + ','.join(chunk)
+            yield f'], "total_students": {len(profiles)}, "model_version": {json.dumps(model.version)}}}'
+        
+        return Response(stream_with_context(generate()), status=200, mimetype='application/json')
         
-        predictions = []
+    except Exception as e:
+        logger.error(f"Batch predictions error: {e}")
+        return jsonify({'error': 'Failed to generate batch predictions'}), 500
+
+@api.route('/predictions/jobs', methods=['POST'])
+@jwt_required()
+@role_required(['teacher', 'administrator'])
+def create_prediction_job():
+    """Enqueue an asynchronous scoring run over a filtered set of students"""
+    try:
+        data = request.get_json(silent=True) or {}
+        filters = data.get('filters', {})
+        
+        mode = data.get('mode', 'full')
+        
+        error = validate_filters(filters)
+        if error:
+            return jsonify({'error': error}), 400
+        if mode not in JOB_MODES:
+            return jsonify({'error': f'Mode must be one of {list(JOB_MODES)}'}), 400
+        if registry.get().is_mock:
+            return jsonify({'error': 'Prediction jobs need the exported models'}), 503
+        
+        job = submit_job(
+            filters,
+            created_by=get_jwt_identity(),
+            parallel=bool(data.get('parallel', False)),
+            mode=mode,
+            explain=bool(data.get('explain', False))
+        )
         
-        for student_id in student_ids:
-            student = StudentProfile.query.get(student_id)
-            if not student:
-                continue
-            
-            # Generate mock prediction
-            base_score = student.previous_scores or 75
-            attendance_factor = (student.attendance or 80) / 100.0
-            study_factor = min((student.hours_studied or 20) / 40.0, 1.0)
-            
-            prediction = base_score * 0.6 + attendance_factor * 20 + study_factor * 15
-            prediction = max(0, min(100, prediction + random.uniform(-5, 5)))
-            
-            predictions.append({
-                'student_id': student_id,
-                'student_name': f"{student.first_name} {student.last_name}",
-                'predicted_score': float(prediction),
-                'confidence_level': 0.85
-            })
+        response = jsonify(job_to_dict(job))
+        response.headers['Location'] = f"/api/predictions/jobs/{job.job_id}"
+        return response, 202
         
-        return jsonify({
-            'predictions': predictions,
-            'total_students': len(predictions)
-        }), 200
+    except Exception as e:
+        logger.error(f"Create prediction job error: {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create prediction job'}), 500
+
+@api.route('/predictions/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+@role_required(['teacher', 'administrator'])
+def get_prediction_job(job_id):
+    """Get job progress and a page of its results"""
+    try:
+        job = PredictionJob.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        cursor = request.args.get('cursor')
+        limit = min(request.args.get('limit', 500, type=int), 5000)
+        
+        result = job_to_dict(job)
+        result.update(get_job_results(job, cursor, limit))
+        return jsonify(result), 200
         
     except Exception as e:
-        logger.error(f"Batch predictions error: {e}")
-        return jsonify({'error': 'Failed to generate batch predictions'}), 500
+        logger.error(f"Get prediction job error: {e}")
+        return jsonify({'error': 'Failed to retrieve prediction job'}), 500
+
+# Model Registry Routes
+@api.route('/models/active', methods=['GET'])
+@jwt_required()
+@role_required(['teacher', 'administrator'])
+def get_active_model():
+    """Get the model version currently serving predictions"""
+    return jsonify(registry.status()), 200
+
+def resolve_model_path(model_dir):
+    """Real path of a model bundle or directory, or None if it is outside MODEL_DIR"""
+    root = os.path.realpath(MODEL_DIR)
+    path = os.path.realpath(model_dir)
+    if path != root and not path.startswith(root + os.sep):
+        return None
+    return path
+
+@api.route('/models/activate', methods=['POST'])
+@jwt_required()
+@role_required(['administrator'])
+def activate_model():
+    """Load a model bundle and swap it in without restarting"""
+    try:
+        data = request.get_json(silent=True) or {}
+        model_dir = data.get('model_dir', registry.model_dir)
+        
+        # Only bundles below the configured model directory may be activated
+        path = resolve_model_path(model_dir)
+        if path is None:
+            return jsonify({'error': f'model_dir must be inside {MODEL_DIR}'}), 400
+        if not os.path.exists(path):
+            return jsonify({'error': 'Model bundle not found'}), 404
+        
+        loaded = registry.activate(model_dir)
+        return jsonify(loaded.to_dict()), 200
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'No trained model found at model_dir'}), 404
+    except Exception as e:
+        logger.error(f"Activate model error: {e}")
+        return jsonify({'error': 'Failed to activate model'}), 500
+
+@api.route('/models/shadow', methods=['GET'])
+@jwt_required()
+@role_required(['teacher', 'administrator'])
+def get_shadow_model():
+    """Agreement and score deltas of the shadow candidate against the live model"""
+    return jsonify(shadow.stats()), 200
+
+@api.route('/models/shadow', methods=['POST'])
+@jwt_required()
+@role_required(['administrator'])
+def start_shadow_model():
+    """Load a candidate model and score copies of live predictions with it in the background"""
+    try:
+        data = request.get_json(silent=True) or {}
+        model_dir = data.get('model_dir')
+        if not model_dir:
+            return jsonify({'error': 'Missing required field: model_dir'}), 400
+        
+        path = resolve_model_path(model_dir)
+        if path is None:
+            return jsonify({'error': f'model_dir must be inside {MODEL_DIR}'}), 400
+        if not os.path.exists(path):
+            return jsonify({'error': 'Model bundle not found'}), 404
+        
+        candidate = load_version(model_dir)
+        if candidate.is_mock:
+            return jsonify({'error': 'No trained model found at model_dir'}), 404
+        
+        shadow.start(candidate)
+        return jsonify(shadow.stats()), 200
+        
+    except Exception as e:
+        logger.error(f"Start shadow model error: {e}")
+        return jsonify({'error': 'Failed to start shadow model'}), 500
+
+@api.route('/models/shadow', methods=['DELETE'])
+@jwt_required()
+@role_required(['administrator'])
+def stop_shadow_model():
+    """Stop shadow scoring and return the final comparison"""
+    stats = shadow.stats()
+    shadow.stop()
+    return jsonify(stats), 200
+
+@api.route('/models/drift', methods=['GET'])
+@jwt_required()
+@role_required(['teacher', 'administrator'])
+def get_model_drift():
+    """Drift of the live student profiles from the active model's training data"""
+    try:
+        model = registry.get()
+        if model.drift_baseline is None:
+            return jsonify({'error': 'Active model has no baseline histograms. Rebuild it with `python -m model.bundle`'}), 503
+        
+        return jsonify(drift_report(model)), 200
+        
+    except Exception as e:
+        logger.error(f"Model drift error: {e}")
+        return jsonify({'error': 'Failed to compute model drift'}), 500
 
 # Analytics and Dashboard Routes
 @api.route('/analytics/overview', methods=['GET'])
@@ -545,6 +823,8 @@ def import_data():
             return jsonify({'error': f'Missing required columns: {missing_columns}'}), 400
         
         imported_count = 0
+        imported_ids = []
+        imported = []
         errors = []
         
         for index, row in df.iterrows():
@@ -581,12 +861,17 @@ def import_data():
                 )
                 
                 db.session.add(student)
+                imported.append(student)
+                imported_ids.append(student.student_id)
                 imported_count += 1
                 
             except Exception as e:
                 errors.append(f"Row {index + 1}: {str(e)}")
         
+        # One histogram update per distinct (feature, value) in the file
+        record_profiles(imported)
         db.session.commit()
+        invalidate_students(imported_ids)
         
         return jsonify({
             'message': f'Successfully imported {imported_count} students',
@@ -14,6 +14,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import secrets
 import string
 from models import db, User, StudentProfile, UserSession
+from model.registry import registry
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -38,6 +39,9 @@ db.init_app(app)
 jwt = JWTManager(app)
 bcrypt = Bcrypt(app)
 mail = Mail(app)
+
+# Start loading the prediction models right away so the first request doesn't pay for it
+registry.preload()
 CORS(app)
 
 # Configure logging
@@ -555,12 +559,14 @@ def rate_limit():
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; reports 503 until the prediction model is loaded"""
+    model_status = registry.status()
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if model_status['ready'] else 'starting',
         'timestamp': datetime.utcnow().isoformat(),
-        'version': '1.0.0'
-    }), 200
+        'version': '1.0.0',
+        'model': model_status
+    }), 200 if model_status['ready'] else 503
 
 # Web interface route
 @app.route('/', methods=['GET'])
@@ -575,9 +581,12 @@ def index():
 if __name__ == '__main__':
     # Import and register API routes
     from api_routes import init_app as init_api_routes
+    from api_migrations import migrate as migrate_api_schema
     
     with app.app_context():
         db.create_all()
+        # create_all() does not add columns or indexes to existing tables
+        migrate_api_schema()
         init_api_routes(app)
     app.run(debug=False, host='0.0.0.0', port=5000)
 =======
@@ -0,0 +1,57 @@
+"""Load time and private memory of the model bundle versus converting the sklearn pickles.
+
+Run from the project root:  python -m benchmarks.bench_bundle
+Each format is loaded in a fresh process so page-cache sharing is measured honestly.
+"""
+import json
+import subprocess
+import sys
+
+PROBE = """
+import json, time
+import numpy as np
+
+def memory():
+    fields = {{}}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('RssAnon', 'RssFile'):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+from model.forest import convert_artifacts
+from model.bundle import load_bundle
+from model.scoring import score_encoded
+
+before = memory()
+start = time.perf_counter()
+if {fmt!r} == 'bundle':
+    models = load_bundle('model_data/model.bundle', verify={verify!r}).models
+else:
+    models = convert_artifacts()
+load_ms = (time.perf_counter() - start) * 1000
+
+# Touch every node once so all model pages are resident
+score_encoded(np.random.rand(2000, models[0].n_features).astype(np.float32), None, models)
+after = memory()
+print(json.dumps({{
+    'load_ms': round(load_ms, 2),
+    'private_mb': round(after['RssAnon'] - before['RssAnon'], 1),
+    'shared_mb': round(after['RssFile'] - before['RssFile'], 1)
+}}))
+"""
+
+def measure(fmt, verify=False):
+    output = subprocess.run([sys.executable, '-c', PROBE.format(fmt=fmt, verify=verify)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    for label, fmt, verify in (('pickle', 'pickle', False), ('bundle', 'bundle', False), ('bundle+verify', 'bundle', True)):
+        result = measure(fmt, verify)
+        print(f"{label:>14}: load {result['load_ms']:>7.2f} ms  "
+              f"private {result['private_mb']:>6.1f} MB  shared {result['shared_mb']:>6.1f} MB")
+
+if __name__ == "__main__":
+    main()
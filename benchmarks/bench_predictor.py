@@ -0,0 +1,168 @@
+"""Latency percentiles and throughput of the prediction pipeline by stage and batch size.
+
+Run from the project root:  python -m benchmarks.bench_predictor [--output bench_predictor.json] [--baseline old.json]
+Preprocessing (categorical encoding), scaling and inference are timed separately,
+plus make_predictions end to end for single rows. Results are written as JSON;
+--baseline prints the change of every p50 against an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from model.forest import MODEL_DIR
+from model.registry import load_version, registry
+
+BATCH_SIZES = [1, 100, 10000, 100000]
+
+# Timed repetitions per batch size; large batches need fewer for stable percentiles
+REPEATS = {1: 2000, 100: 300, 10000: 20, 100000: 5}
+
+STAGES = ('preprocess', 'scale', 'inference', 'total')
+
+def resident_bytes():
+    """Resident set size of this process, or None where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def summarize(timings, rows):
+    timings = np.array(timings) * 1000
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(timings.mean()), 4),
+        'rows_per_sec': round(rows / (p50 / 1000))
+    }
+
+def bench_stages(model, records, batch_size, repeats):
+    """Time each stage of the pipeline on the same batch, repeats times"""
+    encoder, classifier, regressor = model.models
+    batch = [records[i % len(records)] for i in range(batch_size)]
+    timings = {stage: [] for stage in STAGES}
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        raw = encoder.encode(batch)
+        encoded = time.perf_counter()
+        classifier_input, regressor_input = encoder.scale(raw)
+        scaled = time.perf_counter()
+        classifier.predict_proba(classifier_input)
+        regressor.predict(regressor_input)
+        done = time.perf_counter()
+
+        timings['preprocess'].append(encoded - start)
+        timings['scale'].append(scaled - encoded)
+        timings['inference'].append(done - scaled)
+        timings['total'].append(done - start)
+    return {stage: summarize(values, batch_size) for stage, values in timings.items()}
+
+def bench_make_predictions(model, records, repeats):
+    """Single-row latency of model.predictor.make_predictions as the Streamlit page calls it"""
+    from model.predictor import make_predictions
+
+    # Importing the predictor starts the registry preload; let it finish before timing
+    registry.get()
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        make_predictions(records[i % len(records)], model)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, 1)
+
+def compare(results, baseline):
+    print(f"\nChange in p50 against {baseline['meta'].get('git_commit') or 'baseline'} "
+          f"(model {baseline['meta'].get('model_version')}):")
+    for batch_size, stages in results['batches'].items():
+        previous = baseline['batches'].get(batch_size)
+        if previous is None:
+            continue
+        changes = []
+        for stage in STAGES:
+            before, after = previous[stage]['p50_ms'], stages[stage]['p50_ms']
+            changes.append(f"{stage} {(after - before) / before * 100:+.1f}%" if before else f"{stage} n/a")
+        print(f"  batch {batch_size:>7}: " + ", ".join(changes))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=MODEL_DIR, help="Bundle file or model directory to benchmark")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--repeat-scale', type=float, default=1.0, help="Multiply the default repetition counts")
+    parser.add_argument('--output', default='bench_predictor.json')
+    parser.add_argument('--baseline', help="Earlier JSON output to compare against")
+    args = parser.parse_args()
+
+    before = resident_bytes()
+    start = time.perf_counter()
+    model = load_version(args.model)
+    load_ms = (time.perf_counter() - start) * 1000
+    after = resident_bytes()
+    if model.is_mock:
+        raise SystemExit("No trained model found. Run `python -m model.bundle` first")
+
+    encoder, classifier, regressor = model.models
+    data = pd.read_csv(os.path.join(MODEL_DIR, 'cleaned_dataset.csv'))
+    records = data[encoder.feature_names].to_dict('records')
+
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'git_commit': git_commit(),
+            'model_version': model.version,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'model': {
+            'load_ms': round(load_ms, 3),
+            'array_bytes': classifier.nbytes + regressor.nbytes,
+            'resident_bytes_added': None if before is None else after - before,
+            'trees': [classifier.n_trees, regressor.n_trees],
+            'nodes': [classifier.n_nodes, regressor.n_nodes]
+        },
+        'batches': {}
+    }
+
+    print(f"Model {model.version}: loaded in {load_ms:.1f} ms, "
+          f"{results['model']['array_bytes'] / 1e6:.1f} MB of forest arrays")
+    print(f"{'batch':>7} {'stage':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'rows/s':>12}")
+    for batch_size in args.batch_sizes:
+        repeats = max(3, int(REPEATS.get(batch_size, 10) * args.repeat_scale))
+        # One untimed pass so lazy setup and page faults are not counted
+        bench_stages(model, records, batch_size, 1)
+        stages = bench_stages(model, records, batch_size, repeats)
+        results['batches'][str(batch_size)] = stages
+        for stage, stats in stages.items():
+            print(f"{batch_size:>7} {stage:>10} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} "
+                  f"{stats['p99_ms']:>10.3f} {stats['rows_per_sec']:>12,}")
+
+    results['make_predictions'] = bench_make_predictions(model, records, max(3, int(REPEATS[1] * args.repeat_scale)))
+    stats = results['make_predictions']
+    print(f"make_predictions (1 row): p50 {stats['p50_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms, "
+          f"p99 {stats['p99_ms']:.3f} ms")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
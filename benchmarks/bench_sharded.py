@@ -0,0 +1,57 @@
+"""Throughput of sharded multi-process scoring by worker count.
+
+Run from the project root:  python -m benchmarks.bench_sharded --rows 200000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from model.bundle import BUNDLE_FILE, load_bundle
+from model.forest import MODEL_DIR
+from model.parallel import ShardedScorer
+from model.scoring import score_encoded
+
+def load_matrix(rows):
+    """Encode the cleaned dataset and tile it up to the requested number of rows"""
+    path = os.path.join(MODEL_DIR, BUNDLE_FILE)
+    if not os.path.exists(path):
+        raise SystemExit("Model bundle not found. Run `python -m model.bundle` first")
+    models = load_bundle(path).models
+
+    data = pd.read_csv(os.path.join(MODEL_DIR, 'cleaned_dataset.csv'))
+    columns = {column: data[column].tolist() for column in data.columns}
+    raw = models[0].encode(columns)
+    return models, np.resize(raw, (rows, raw.shape[1]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    models, raw = load_matrix(args.rows)
+    print(f"Scoring {args.rows:,} rows on {os.cpu_count()} CPUs (best of {args.repeat})")
+
+    start = time.perf_counter()
+    reference = score_encoded(raw, None, models)
+    baseline = time.perf_counter() - start
+    print(f"{'in-process':>12}: {args.rows / baseline:>12,.0f} rows/s")
+
+    for workers in sorted(set(args.workers)):
+        with ShardedScorer(workers) as scorer:
+            scorer.warm_up()
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = scorer.score(raw)
+                timings.append(time.perf_counter() - start)
+
+        if not all(np.array_equal(a, b) for a, b in zip(reference, result)):
+            print(f"❌ {workers} workers produced different predictions than in-process scoring")
+        best = min(timings)
+        print(f"{workers:>4} workers: {args.rows / best:>12,.0f} rows/s  speedup {baseline / best:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Reader/writer throughput of the shared SQLite database under the default and WAL storage profiles.
+
+Run from the project root:  python -m benchmarks.bench_sqlite_concurrency [--readers 4] [--writers 2] [--seconds 5]
+Reader and writer processes stand in for the Streamlit app and the Flask API
+working on one database file. Writers insert performance records one
+transaction at a time; readers run the dashboard's per-student aggregate.
+Each profile runs on a fresh copy of the same seeded database.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import numpy as np
+from data.storage import apply_storage_profile, is_busy_error
+
+PROFILES = ('default', 'wal')
+
+SEED_STUDENTS = 500
+SEED_RECORDS_PER_STUDENT = 20
+
+READ_QUERY = '''
+    SELECT student_id, AVG(score * 100.0 / max_score), COUNT(*)
+    FROM performance_records GROUP BY student_id
+'''
+WRITE_QUERY = '''
+    INSERT INTO performance_records (student_id, subject, exam_type, score, max_score, date_taken, recorded_by)
+    VALUES (?, ?, 'Quiz', ?, 100, date('now'), 1)
+'''
+
+def connect(db_path, profile):
+    # The default profile is the plain connection the app opened before: rollback journal, 5 s timeout
+    conn = sqlite3.connect(db_path)
+    if profile == 'wal':
+        apply_storage_profile(conn)
+    return conn
+
+def seed(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE performance_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, student_id TEXT NOT NULL, subject TEXT NOT NULL,
+            exam_type TEXT NOT NULL, score REAL NOT NULL, max_score REAL NOT NULL,
+            date_taken DATE NOT NULL, recorded_by INTEGER, notes TEXT
+        )
+    ''')
+    rng = random.Random(0)
+    conn.executemany(WRITE_QUERY, [
+        (f'STU{student:06d}', rng.choice(['Math', 'Science', 'English']), rng.uniform(40, 100))
+        for student in range(SEED_STUDENTS) for _ in range(SEED_RECORDS_PER_STUDENT)
+    ])
+    conn.commit()
+    conn.close()
+
+def worker(role, db_path, profile, seconds, start_at, results):
+    conn = connect(db_path, profile)
+    rng = random.Random(os.getpid())
+    latencies, errors = [], 0
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            if role == 'reader':
+                conn.execute(READ_QUERY).fetchall()
+            else:
+                conn.execute(WRITE_QUERY, (f'STU{rng.randrange(SEED_STUDENTS):06d}', 'Math', rng.uniform(40, 100)))
+                conn.commit()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e):
+                raise
+            conn.rollback()
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    results.put((role, latencies, errors))
+
+def run_profile(profile, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seed(db_path)
+        # journal_mode=WAL is stored in the file, so it is switched before the workers start
+        connect(db_path, profile).close()
+
+        results = multiprocessing.Queue()
+        start_at = time.time() + 1.0
+        processes = [
+            multiprocessing.Process(target=worker, args=(role, db_path, profile, seconds, start_at, results))
+            for role in ['reader'] * readers + ['writer'] * writers
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    summary = {}
+    for role in ('reader', 'writer'):
+        latencies = np.concatenate([np.array(l) for r, l, _ in collected if r == role] or [np.array([])]) * 1000
+        errors = sum(e for r, _, e in collected if r == role)
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (None, None)
+        summary[role] = {
+            'ops_per_sec': round(len(latencies) / seconds, 1),
+            'p50_ms': None if p50 is None else round(float(p50), 3),
+            'p99_ms': None if p99 is None else round(float(p99), 3),
+            'busy_errors': errors
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--output', default='bench_sqlite_concurrency.json')
+    args = parser.parse_args()
+
+    results = {
+        'config': {'readers': args.readers, 'writers': args.writers, 'seconds': args.seconds, 'cpu_count': os.cpu_count()},
+        'profiles': {}
+    }
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:.0f}s per profile")
+    print(f"{'profile':>8} {'role':>7} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'busy':>6}")
+    for profile in PROFILES:
+        summary = run_profile(profile, args.readers, args.writers, args.seconds)
+        results['profiles'][profile] = summary
+        for role, stats in summary.items():
+            p50 = f"{stats['p50_ms']:.3f}" if stats['p50_ms'] is not None else '-'
+            p99 = f"{stats['p99_ms']:.3f}" if stats['p99_ms'] is not None else '-'
+            print(f"{profile:>8} {role:>7} {stats['ops_per_sec']:>10,.1f} {p50:>10} {p99:>10} {stats['busy_errors']:>6}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,201 @@
+import math
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 import bcrypt
 import streamlit as st
-from datetime import datetime, timedelta
+from datetime import date as date_type, datetime, timedelta
 import pandas as pd
 import json
+from data.migrations import migrate
+from data.storage import Checkpointer, apply_storage_profile, retry_busy
+
+# Average score below which a student counts as at risk on the dashboards
+AT_RISK_SCORE = 70
+
+# Scores shown per student, and the window student averages are taken over
+RECENT_RECORDS = 50
+
+# Performance records ranked per student from the most recent (recent = 1); the
+# first RECENT_RECORDS are the ones get_student_performance returns
+RANKED_SCORES_QUERY = '''
+    SELECT
+        pr.*,
+        ROW_NUMBER() OVER (PARTITION BY pr.student_id ORDER BY pr.date_taken DESC, pr.id DESC) as recent
+    FROM performance_records pr
+'''
+
+# Each student's exam count and the average of their RECENT_RECORDS most recent scores
+RECENT_SCORES_QUERY = f'''
+    SELECT student_id, AVG(CASE WHEN recent <= ? THEN score END) as avg_score, COUNT(*) as total_exams
+    FROM ({RANKED_SCORES_QUERY})
+    GROUP BY student_id
+'''
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'late')
+
+# Idle connections kept open per database; extra connections are closed when released
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+
+# A class grid saved again for the same date updates the students' entries for
+# that date; a student with no entry yet gets one inserted
+UPDATE_ATTENDANCE = '''
+    UPDATE attendance_records SET status = ?, recorded_by = ?, notes = ?
+    WHERE student_id = ? AND date = ?
+'''
+INSERT_ATTENDANCE = '''
+    INSERT INTO attendance_records (student_id, date, status, recorded_by, notes)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+def to_number(value):
+    """Finite float from a form or grid cell, or None if it is blank or not a number"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def to_iso_date(value):
+    """YYYY-MM-DD string from a date, datetime or ISO string, or None if it is not a date"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date_type):
+        return value.isoformat()
+    try:
+        return date_type.fromisoformat(str(value)[:10]).isoformat()
+    except ValueError:
+        return None
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection whose close() hands it back to its pool instead of closing it"""
+    
+    def close(self):
+        pool = getattr(self, 'pool', None)
+        if pool is None:
+            super().close()
+        else:
+            pool.release(self)
+
+class ConnectionPool:
+    """Reuses SQLite connections across DatabaseManager calls and Streamlit reruns.
+    
+    Connections are opened with check_same_thread=False, so a connection released
+    by one script thread can be checked out by another. The pool never blocks:
+    when no idle connection is left a new one is opened, and connections beyond
+    the pool size are closed on release.
+    """
+    
+    def __init__(self, db_path, size=DB_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=PooledConnection)
+        apply_storage_profile(conn)
+        conn.pool = self
+        return conn
+    
+    def acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                self.created += 1
+            else:
+                self.reused += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        
+        if conn is None:
+            conn = self._connect()
+        conn.checked_out = True
+        return conn
+    
+    def release(self, conn):
+        # Closing twice must not put the same connection in the pool twice
+        if not getattr(conn, 'checked_out', False):
+            return
+        conn.checked_out = False
+        
+        # Work left uncommitted by the caller is not seen by the next one
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        
+        with self._lock:
+            self.in_use -= 1
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+            self.closed += 1
+        sqlite3.Connection.close(conn)
+    
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.closed += len(idle)
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+    
+    def stats(self):
+        with self._lock:
+            checkouts = self.created + self.reused
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'created': self.created,
+                'reused': self.reused,
+                'closed': self.closed,
+                'reuse_rate': round(self.reused / checkouts, 4) if checkouts else 0.0
+            }
 
 class DatabaseManager:
     def __init__(self, db_path="student_performance.db"):
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path)
         self.init_database()
+        self.checkpointer = Checkpointer(db_path)
+        self.checkpointer.start()
     
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        """Get a pooled database connection; close() returns it to the pool"""
+        return self.pool.acquire()
+    
+    @contextmanager
+    def transaction(self):
+        """Pooled connection whose statements commit together, or roll back on error"""
+        conn = self.get_connection()
+        try:
+            # Take the write lock up front: a deferred transaction that starts as a
+            # reader cannot wait for the lock when it upgrades and fails at once
+            retry_busy(lambda: conn.execute('BEGIN IMMEDIATE'))
+        except Exception:
+            conn.close()
+            raise
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def pool_stats(self):
+        """Connection pool and WAL checkpoint counters for monitoring"""
+        stats = self.pool.stats()
+        stats['checkpoints'] = self.checkpointer.stats()
+        return stats
     
     def init_database(self):
         """Initialize database tables"""
@@ -110,6 +293,9 @@ class DatabaseManager:
         ''')
         
         conn.commit()
+        
+        # Indexes and later schema changes are versioned migrations
+        migrate(conn)
         conn.close()
     
     def hash_password(self, password):
@@ -123,18 +309,13 @@ class DatabaseManager:
     def create_user(self, username, email, password, role):
         """Create a new user"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
             password_hash = self.hash_password(password)
             
-            cursor.execute('''
-                INSERT INTO users (username, email, password_hash, role)
-                VALUES (?, ?, ?, ?)
-            ''', (username, email, password_hash, role))
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as conn:
+                conn.execute('''
+                    INSERT INTO users (username, email, password_hash, role)
+                    VALUES (?, ?, ?, ?)
+                ''', (username, email, password_hash, role))
             return True
         except sqlite3.IntegrityError:
             return False
@@ -174,21 +355,16 @@ class DatabaseManager:
     
     def create_student_profile(self, user_id, student_data):
         """Create or update student profile"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO student_profiles 
-            (user_id, student_id, first_name, last_name, age, gender, grade_level, school_name, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (
-            user_id, student_data['student_id'], student_data['first_name'], 
-            student_data['last_name'], student_data['age'], student_data['gender'],
-            student_data['grade_level'], student_data['school_name']
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO student_profiles 
+                (user_id, student_id, first_name, last_name, age, gender, grade_level, school_name, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (
+                user_id, student_data['student_id'], student_data['first_name'], 
+                student_data['last_name'], student_data['age'], student_data['gender'],
+                student_data['grade_level'], student_data['school_name']
+            ))
     
     def get_student_profile(self, user_id):
         """Get student profile by user ID"""
@@ -203,19 +379,14 @@ class DatabaseManager:
     
     def add_performance_record(self, student_id, subject, exam_type, score, max_score, date_taken, recorded_by, notes=""):
         """Add a performance record"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO performance_records 
-            (student_id, subject, exam_type, score, max_score, date_taken, recorded_by, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (student_id, subject, exam_type, score, max_score, date_taken, recorded_by, notes))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO performance_records 
+                (student_id, subject, exam_type, score, max_score, date_taken, recorded_by, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (student_id, subject, exam_type, score, max_score, date_taken, recorded_by, notes))
     
-    def get_student_performance(self, student_id, limit=50):
+    def get_student_performance(self, student_id, limit=RECENT_RECORDS):
         """Get performance records for a student"""
         conn = self.get_connection()
         
@@ -234,17 +405,91 @@ class DatabaseManager:
     
     def add_attendance_record(self, student_id, date, status, recorded_by, notes=""):
         """Add attendance record"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO attendance_records 
-            (student_id, date, status, recorded_by, notes)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (student_id, date, status, recorded_by, notes))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute(INSERT_ATTENDANCE, (student_id, date, status, recorded_by, notes))
+    
+    def _known_student_ids(self, conn):
+        return {row[0] for row in conn.execute('SELECT student_id FROM student_profiles')}
+    
+    def add_performance_records(self, records, recorded_by):
+        """Add many performance records in one transaction; nothing is written if any record is invalid.
+        
+        Each record is a dict with student_id, subject, exam_type, score, date_taken
+        and optionally max_score (default 100) and notes. Raises ValueError listing
+        every invalid record. Returns the number of records written.
+        """
+        rows = []
+        errors = []
+        with self.transaction() as conn:
+            known = self._known_student_ids(conn)
+            for i, record in enumerate(records, 1):
+                student_id = record.get('student_id')
+                max_score = to_number(record.get('max_score', 100))
+                score = to_number(record.get('score'))
+                date_taken = to_iso_date(record.get('date_taken'))
+                if student_id not in known:
+                    errors.append(f"Record {i}: unknown student {student_id!r}")
+                elif not record.get('subject') or not record.get('exam_type'):
+                    errors.append(f"Record {i} ({student_id}): subject and exam type are required")
+                elif date_taken is None:
+                    errors.append(f"Record {i} ({student_id}): {record.get('date_taken')!r} is not a valid date")
+                elif max_score is None or max_score <= 0:
+                    errors.append(f"Record {i} ({student_id}): maximum score must be a positive number")
+                elif score is None:
+                    errors.append(f"Record {i} ({student_id}): score {record.get('score')!r} is not a number")
+                elif not 0 <= score <= max_score:
+                    errors.append(f"Record {i} ({student_id}): score must be between 0 and {max_score:g}")
+                else:
+                    rows.append((student_id, record['subject'], record['exam_type'], score, max_score,
+                                 date_taken, recorded_by, record.get('notes') or ''))
+            
+            # Raising inside the transaction rolls back the IMMEDIATE lock without writing
+            if errors:
+                raise ValueError(errors)
+            
+            conn.executemany('''
+                INSERT INTO performance_records 
+                (student_id, subject, exam_type, score, max_score, date_taken, recorded_by, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        return len(rows)
+    
+    def add_attendance_records(self, records, recorded_by):
+        """Add many attendance records in one transaction; nothing is written if any record is invalid.
+        
+        Each record is a dict with student_id, date, status and optionally notes.
+        A student may appear only once per date in a batch; entries already
+        stored for the same student and date are updated in place. Raises ValueError
+        listing every invalid record. Returns the number of records written.
+        """
+        rows = []
+        errors = []
+        seen = set()
+        with self.transaction() as conn:
+            known = self._known_student_ids(conn)
+            for i, record in enumerate(records, 1):
+                student_id = record.get('student_id')
+                date = to_iso_date(record.get('date'))
+                if student_id not in known:
+                    errors.append(f"Record {i}: unknown student {student_id!r}")
+                elif date is None:
+                    errors.append(f"Record {i} ({student_id}): {record.get('date')!r} is not a valid date")
+                elif record.get('status') not in ATTENDANCE_STATUSES:
+                    errors.append(f"Record {i} ({student_id}): status must be one of {', '.join(ATTENDANCE_STATUSES)}")
+                elif (student_id, date) in seen:
+                    errors.append(f"Record {i} ({student_id}): duplicate entry for {date}")
+                else:
+                    seen.add((student_id, date))
+                    rows.append((student_id, date, record['status'], recorded_by, record.get('notes') or ''))
+            
+            if errors:
+                raise ValueError(errors)
+            
+            for student_id, date, status, recorder, notes in rows:
+                updated = conn.execute(UPDATE_ATTENDANCE, (status, recorder, notes, student_id, date)).rowcount
+                if not updated:
+                    conn.execute(INSERT_ATTENDANCE, (student_id, date, status, recorder, notes))
+        return len(rows)
     
     def get_student_attendance(self, student_id, start_date=None, end_date=None):
         """Get attendance records for a student"""
@@ -275,16 +520,11 @@ class DatabaseManager:
     
     def add_notification(self, user_id, title, message, notification_type="info"):
         """Add a notification"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO notifications (user_id, title, message, type)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, title, message, notification_type))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO notifications (user_id, title, message, type)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, title, message, notification_type))
     
     def get_user_notifications(self, user_id, unread_only=False):
         """Get notifications for a user"""
@@ -306,26 +546,17 @@ class DatabaseManager:
     
     def mark_notification_read(self, notification_id):
         """Mark notification as read"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('UPDATE notifications SET is_read = TRUE WHERE id = ?', (notification_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('UPDATE notifications SET is_read = TRUE WHERE id = ?', (notification_id,))
     
     def add_recommendation(self, student_id, recommendation_type, title, description, priority="medium"):
         """Add a recommendation for a student"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO recommendations 
-            (student_id, recommendation_type, title, description, priority)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (student_id, recommendation_type, title, description, priority))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO recommendations 
+                (student_id, recommendation_type, title, description, priority)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (student_id, recommendation_type, title, description, priority))
     
     def get_student_recommendations(self, student_id):
         """Get recommendations for a student"""
@@ -356,6 +587,140 @@ class DatabaseManager:
         conn.close()
         return df
     
+    def get_student_metrics(self):
+        """Recent average score, exam count and attendance rate of every student in one query"""
+        conn = self.get_connection()
+        
+        # Each records table is aggregated once and joined to the student list,
+        # so students without records keep NULL metrics
+        query = f'''
+            SELECT
+                sp.student_id,
+                sp.first_name,
+                sp.last_name,
+                sp.grade_level,
+                perf.avg_score,
+                COALESCE(perf.total_exams, 0) as total_exams,
+                att.attendance_rate,
+                COALESCE(att.attendance_days, 0) as attendance_days
+            FROM student_profiles sp
+            JOIN users u ON sp.user_id = u.id
+            LEFT JOIN ({RECENT_SCORES_QUERY}) perf ON perf.student_id = sp.student_id
+            LEFT JOIN (
+                SELECT
+                    student_id,
+                    SUM(status = 'present') * 100.0 / COUNT(*) as attendance_rate,
+                    COUNT(*) as attendance_days
+                FROM attendance_records
+                GROUP BY student_id
+            ) att ON att.student_id = sp.student_id
+            ORDER BY sp.last_name, sp.first_name
+        '''
+        
+        df = pd.read_sql_query(query, conn, params=(RECENT_RECORDS,))
+        conn.close()
+        return df
+    
+    def get_class_summary(self, at_risk_score=AT_RISK_SCORE):
+        """Class-wide totals and averages of per-student metrics as a dict.
+
+        Class average and at-risk count use each student's recent average, as in get_student_metrics.
+        """
+        conn = self.get_connection()
+        
+        query = f'''
+            WITH students AS (
+                SELECT sp.student_id
+                FROM student_profiles sp
+                JOIN users u ON sp.user_id = u.id
+            ),
+            perf AS (
+                SELECT r.* FROM ({RECENT_SCORES_QUERY}) r
+                JOIN students s ON s.student_id = r.student_id
+            ),
+            att AS (
+                SELECT ar.student_id, SUM(ar.status = 'present') * 100.0 / COUNT(*) as attendance_rate
+                FROM attendance_records ar
+                JOIN students s ON s.student_id = ar.student_id
+                GROUP BY ar.student_id
+            )
+            SELECT
+                (SELECT COUNT(*) FROM students) as total_students,
+                (SELECT AVG(avg_score) FROM perf) as class_average,
+                (SELECT COUNT(*) FROM perf WHERE avg_score < ?) as at_risk,
+                (SELECT AVG(attendance_rate) FROM att) as avg_attendance,
+                (SELECT COALESCE(SUM(total_exams), 0) FROM perf) as total_performance_records
+        '''
+        
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(query, (RECENT_RECORDS, at_risk_score)).fetchone()
+        conn.close()
+        return dict(row)
+    
+    def get_recent_scores(self):
+        """Each student's RECENT_RECORDS most recent performance records, with the student's name.
+        
+        The same scores the dashboard averages are computed from, so distributions and averages agree.
+        """
+        conn = self.get_connection()
+        
+        query = f'''
+            SELECT
+                pr.student_id,
+                sp.first_name || ' ' || sp.last_name as student_name,
+                pr.subject,
+                pr.score,
+                pr.exam_type,
+                pr.date_taken
+            FROM ({RANKED_SCORES_QUERY}) pr
+            JOIN student_profiles sp ON sp.student_id = pr.student_id
+            JOIN users u ON sp.user_id = u.id
+            WHERE pr.recent <= ?
+            ORDER BY pr.date_taken
+        '''
+        
+        df = pd.read_sql_query(query, conn, params=(RECENT_RECORDS,))
+        conn.close()
+        return df
+    
+    def get_attendance_status_counts(self):
+        """Number of attendance records per status across all students"""
+        conn = self.get_connection()
+        
+        query = '''
+            SELECT ar.status, COUNT(*) as count
+            FROM attendance_records ar
+            JOIN student_profiles sp ON sp.student_id = ar.student_id
+            JOIN users u ON sp.user_id = u.id
+            GROUP BY ar.status
+            ORDER BY count DESC
+        '''
+        
+        df = pd.read_sql_query(query, conn)
+        conn.close()
+        return df
+    
+    def get_duplicate_attendance(self):
+        """Students with more than one attendance record on a date, for an administrator to resolve"""
+        conn = self.get_connection()
+        
+        query = '''
+            SELECT
+                ar.student_id,
+                ar.date,
+                COUNT(*) as entries,
+                GROUP_CONCAT(ar.status, ', ') as statuses,
+                GROUP_CONCAT(ar.id, ', ') as record_ids
+            FROM attendance_records ar
+            GROUP BY ar.student_id, ar.date
+            HAVING COUNT(*) > 1
+            ORDER BY ar.date DESC, ar.student_id
+        '''
+        
+        df = pd.read_sql_query(query, conn)
+        conn.close()
+        return df
+    
     def get_performance_summary(self, student_id):
         """Get performance summary for a student"""
         conn = self.get_connection()
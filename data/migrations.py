@@ -0,0 +1,58 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Schema changes applied on top of the tables init_database creates. Versions
+# are applied in order and the applied version is kept in PRAGMA user_version,
+# so each migration runs once per database file. Append new migrations; never
+# edit one that has shipped.
+MIGRATIONS = [
+    (1, "Composite indexes matching the per-student and per-user lookups", [
+        # get_student_performance: WHERE student_id = ? ORDER BY date_taken DESC
+        '''CREATE INDEX IF NOT EXISTS idx_performance_records_student_date
+           ON performance_records (student_id, date_taken)''',
+        # get_student_attendance: WHERE student_id = ? [AND date BETWEEN ...] ORDER BY date DESC
+        '''CREATE INDEX IF NOT EXISTS idx_attendance_records_student_date
+           ON attendance_records (student_id, date)''',
+        # get_user_notifications: WHERE user_id = ? [AND is_read = FALSE] ORDER BY created_at DESC
+        '''CREATE INDEX IF NOT EXISTS idx_notifications_user_read_created
+           ON notifications (user_id, is_read, created_at)''',
+        # get_student_recommendations: WHERE student_id = ? ORDER BY created_at DESC
+        '''CREATE INDEX IF NOT EXISTS idx_recommendations_student_created
+           ON recommendations (student_id, created_at)''',
+        # get_student_profile and the student list join on user_id
+        '''CREATE INDEX IF NOT EXISTS idx_student_profiles_user_id
+           ON student_profiles (user_id)''',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn):
+    """Apply pending migrations, each in its own transaction; returns the versions applied"""
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        # The version is re-read under the write lock so two processes starting
+        # together do not both apply the same migration
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Applied schema migration {version}: {description}")
+        applied.append(version)
+
+    if applied:
+        # Refresh planner statistics for the tables the new indexes cover
+        conn.execute('PRAGMA optimize')
+    return applied
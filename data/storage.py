@@ -0,0 +1,127 @@
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Storage profile shared by the Streamlit app and the Flask API, which use the same database file
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+
+# Background checkpoints keep the WAL short; the automatic checkpoint in the
+# committing thread only kicks in if they fall far behind
+SQLITE_CHECKPOINT_INTERVAL = float(os.environ.get('SQLITE_CHECKPOINT_INTERVAL', 30))
+SQLITE_AUTOCHECKPOINT_PAGES = 10000
+SQLITE_WAL_SIZE_LIMIT = 64 * 1024 * 1024
+
+# Attempts to take the write lock once busy_timeout has run out
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05
+
+STORAGE_PRAGMAS = (
+    f'PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}',
+    # Readers never block writers and writers never block readers
+    'PRAGMA journal_mode = WAL',
+    # In WAL mode NORMAL only syncs at checkpoints; a power loss can drop the
+    # last commits but never corrupts the database
+    'PRAGMA synchronous = NORMAL',
+    f'PRAGMA mmap_size = {SQLITE_MMAP_SIZE}',
+    f'PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}',
+    'PRAGMA temp_store = MEMORY',
+    f'PRAGMA wal_autocheckpoint = {SQLITE_AUTOCHECKPOINT_PAGES}',
+    f'PRAGMA journal_size_limit = {SQLITE_WAL_SIZE_LIMIT}',
+)
+
+def apply_storage_profile(conn):
+    """Apply the concurrent-access profile to a new DB-API SQLite connection"""
+    cursor = conn.cursor()
+    for pragma in STORAGE_PRAGMAS:
+        cursor.execute(pragma).fetchall()
+    cursor.close()
+
+def is_busy_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+def retry_busy(operation, retries=BUSY_RETRIES, backoff=BUSY_BACKOFF):
+    """Run operation, retrying with jittered exponential backoff while the database is busy"""
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"Database busy, retrying in {delay * 1000:.0f} ms: {e}")
+            time.sleep(delay)
+
+def register_sqlalchemy_profile():
+    """Apply the storage profile to every SQLite connection SQLAlchemy opens"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'connect')
+    def _apply_profile(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            apply_storage_profile(dbapi_connection)
+
+class Checkpointer:
+    """Background thread that checkpoints the WAL so writers do not pay for it.
+
+    PASSIVE checkpoints never wait for readers or writers. When the WAL has
+    grown past SQLITE_WAL_SIZE_LIMIT a TRUNCATE checkpoint is attempted to
+    reset it; it gives up after busy_timeout if readers keep it pinned.
+    """
+
+    def __init__(self, db_path, interval=SQLITE_CHECKPOINT_INTERVAL):
+        self.db_path = db_path
+        self.interval = interval
+        self.checkpoints = 0
+        self.truncations = 0
+        self.busy = 0
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name='sqlite-checkpointer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def checkpoint(self, conn):
+        wal_path = f'{self.db_path}-wal'
+        wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        mode = 'TRUNCATE' if wal_size > SQLITE_WAL_SIZE_LIMIT else 'PASSIVE'
+        busy, log_frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        self.checkpoints += 1
+        self.truncations += mode == 'TRUNCATE'
+        self.busy += busy
+        self.last_result = {'mode': mode, 'wal_bytes': wal_size, 'log_frames': log_frames, 'checkpointed': checkpointed}
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        apply_storage_profile(conn)
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    self.checkpoint(conn)
+                except sqlite3.Error as e:
+                    logger.warning(f"WAL checkpoint failed: {e}")
+        finally:
+            conn.close()
+
+    def stats(self):
+        return {
+            'interval_seconds': self.interval,
+            'checkpoints': self.checkpoints,
+            'truncations': self.truncations,
+            'busy': self.busy,
+            'last': self.last_result
+        }
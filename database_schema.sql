@@ -141,18 +141,70 @@ CREATE TABLE participation_records (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Prediction jobs table (for asynchronous whole-school scoring runs)
+CREATE TABLE prediction_jobs (
+    job_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+    mode VARCHAR(20) NOT NULL DEFAULT 'full' CHECK (mode IN ('full', 'incremental', 'counterfactual')),
+    filters JSONB,
+    model_version VARCHAR(50),
+    total_students INTEGER DEFAULT 0,
+    processed_students INTEGER DEFAULT 0,
+    skipped_students INTEGER DEFAULT 0,
+    error TEXT,
+    created_by UUID REFERENCES users(user_id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
 -- Predictions table (for storing ML model predictions)
 CREATE TABLE predictions (
     prediction_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     student_id VARCHAR(20) REFERENCES student_profiles(student_id) ON DELETE CASCADE,
     predicted_score DECIMAL(5,2) CHECK (predicted_score >= 0 AND predicted_score <= 100),
     confidence_level DECIMAL(3,2) CHECK (confidence_level >= 0 AND confidence_level <= 1),
+    performance_category INTEGER CHECK (performance_category >= 0 AND performance_category <= 2),
     prediction_date DATE NOT NULL,
     model_version VARCHAR(50),
+    feature_hash VARCHAR(40),
+    job_id UUID REFERENCES prediction_jobs(job_id) ON DELETE SET NULL,
     features_used JSONB,
+    explanation JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Counterfactuals table (cheapest feature changes that move at-risk students out of "At Risk")
+CREATE TABLE counterfactuals (
+    counterfactual_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    job_id UUID REFERENCES prediction_jobs(job_id) ON DELETE CASCADE,
+    student_id VARCHAR(20) NOT NULL REFERENCES student_profiles(student_id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    changes JSONB NOT NULL,
+    cost DECIMAL(8,4),
+    predicted_score DECIMAL(5,2),
+    confidence_level DECIMAL(3,2),
+    performance_category INTEGER CHECK (performance_category >= 0 AND performance_category <= 2),
+    model_version VARCHAR(50),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Live feature histograms of student_profiles, kept up to date on every write for drift monitoring
+CREATE TABLE feature_histograms (
+    feature VARCHAR(50) NOT NULL,
+    value VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (feature, value)
+);
+
+-- Profile count and latest profile update the histograms were synced with, and the last full recount
+CREATE TABLE feature_histogram_state (
+    id INTEGER PRIMARY KEY,
+    profile_count INTEGER NOT NULL DEFAULT 0,
+    last_profile_update TIMESTAMP,
+    rebuilt_at TIMESTAMP
+);
+
 -- Recommendations table
 CREATE TABLE recommendations (
     recommendation_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -210,10 +262,15 @@ CREATE TABLE user_sessions (
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_role ON users(role);
 CREATE INDEX idx_student_profiles_user_id ON student_profiles(user_id);
+CREATE INDEX idx_student_profiles_updated_at ON student_profiles(updated_at);
 CREATE INDEX idx_performance_records_student_id ON performance_records(student_id);
 CREATE INDEX idx_performance_records_exam_date ON performance_records(exam_date);
 CREATE INDEX idx_predictions_student_id ON predictions(student_id);
 CREATE INDEX idx_predictions_date ON predictions(prediction_date);
+CREATE INDEX idx_predictions_cache_key ON predictions(student_id, feature_hash, model_version);
+CREATE INDEX idx_predictions_job ON predictions(job_id, student_id);
+CREATE INDEX idx_predictions_freshness ON predictions(student_id, model_version, created_at);
+CREATE INDEX idx_counterfactuals_job ON counterfactuals(job_id, student_id, rank);
 CREATE INDEX idx_notifications_user_id ON notifications(user_id);
 CREATE INDEX idx_notifications_status ON notifications(status);
 CREATE INDEX idx_alerts_student_id ON alerts(student_id);
@@ -0,0 +1,140 @@
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import func, text
+from models import db, StudentProfile, FeatureHistogram, FeatureHistogramState
+from model.drift import drift_scores, value_key
+from model.scoring import PROFILE_FEATURES
+
+logger = logging.getLogger(__name__)
+
+# One statement per changed (feature, value) pair, whatever the table size
+UPSERT_HISTOGRAM = text('''
+    INSERT INTO feature_histograms (feature, value, count) VALUES (:feature, :value, :delta)
+    ON CONFLICT (feature, value) DO UPDATE SET count = feature_histograms.count + excluded.count
+''')
+
+# The API hooks keep the histograms current on a best-effort basis; writes that
+# bypass them (bulk SQL, migrations) are caught by the state check below or,
+# failing that, by a full recount once the counts are this old
+DRIFT_REBUILD_SECONDS = int(os.environ.get('DRIFT_REBUILD_SECONDS', 3600))
+
+# The state check against student_profiles runs at most this often per process
+DRIFT_CHECK_SECONDS = int(os.environ.get('DRIFT_CHECK_SECONDS', 60))
+
+ENSURE_STATE = text('INSERT INTO feature_histogram_state (id, profile_count) VALUES (1, 0) ON CONFLICT (id) DO NOTHING')
+
+# Runs after the caller's writes are flushed, so MAX(updated_at) includes them
+UPDATE_STATE = text('''
+    UPDATE feature_histogram_state
+    SET profile_count = profile_count + :delta,
+        last_profile_update = (SELECT MAX(updated_at) FROM student_profiles)
+    WHERE id = 1
+''')
+
+_checked_at = 0.0
+
+def profile_values(profile):
+    """Histogram keys of a profile's features, taken before an update changes them"""
+    return {attribute: value_key(getattr(profile, attribute)) for attribute, _ in PROFILE_FEATURES}
+
+def _apply(deltas):
+    rows = [{'feature': feature, 'value': value, 'delta': delta} for (feature, value), delta in deltas.items() if delta]
+    if rows:
+        db.session.execute(UPSERT_HISTOGRAM, rows)
+
+def _sync_state(profile_delta):
+    db.session.flush()
+    db.session.execute(ENSURE_STATE)
+    db.session.execute(UPDATE_STATE, {'delta': profile_delta})
+
+def record_profiles(profiles, sign=1):
+    """Count created (sign=1) or deleted (sign=-1) profiles in the live histograms.
+
+    Runs in the caller's transaction, so the counts commit or roll back with the profiles.
+    """
+    deltas = Counter()
+    for profile in profiles:
+        for attribute, value in profile_values(profile).items():
+            deltas[(attribute, value)] += sign
+    _apply(deltas)
+    _sync_state(sign * len(profiles))
+
+def record_update(before, profile):
+    """Move an updated profile's changed features from their old bins to the new ones"""
+    deltas = Counter()
+    for attribute, value in profile_values(profile).items():
+        if value != before[attribute]:
+            deltas[(attribute, before[attribute])] -= 1
+            deltas[(attribute, value)] += 1
+    _apply(deltas)
+    _sync_state(0)
+
+def rebuild_histograms():
+    """Recount the live histograms from student_profiles with one grouped query per feature"""
+    FeatureHistogram.query.delete()
+    for attribute, _ in PROFILE_FEATURES:
+        column = getattr(StudentProfile, attribute)
+        counts = Counter()
+        for value, count in db.session.query(column, func.count()).group_by(column):
+            counts[(attribute, value_key(value))] += count
+        _apply(counts)
+
+    profile_count, last_update = db.session.query(func.count(StudentProfile.student_id),
+                                                  func.max(StudentProfile.updated_at)).one()
+    db.session.execute(ENSURE_STATE)
+    state = db.session.get(FeatureHistogramState, 1)
+    state.profile_count = profile_count
+    state.last_profile_update = last_update
+    state.rebuilt_at = datetime.utcnow()
+    db.session.commit()
+
+def stale_reason():
+    """Why the live histograms must be recounted, or None if they can be trusted"""
+    global _checked_at
+    state = db.session.get(FeatureHistogramState, 1)
+    if state is None or state.rebuilt_at is None:
+        return 'never counted'
+    if (datetime.utcnow() - state.rebuilt_at).total_seconds() > DRIFT_REBUILD_SECONDS:
+        return 'scheduled recount'
+    if time.monotonic() - _checked_at < DRIFT_CHECK_SECONDS:
+        return None
+
+    # One indexed aggregate catches profiles added, removed or edited without the hooks
+    _checked_at = time.monotonic()
+    profile_count, last_update = db.session.query(func.count(StudentProfile.student_id),
+                                                  func.max(StudentProfile.updated_at)).one()
+    if profile_count != state.profile_count:
+        return 'profile count changed outside the API'
+    if last_update is not None and (state.last_profile_update is None or last_update > state.last_profile_update):
+        return 'profiles updated outside the API'
+    return None
+
+def live_histograms():
+    """Live value counts as {attribute: {value_key: count}}, recounted first if they may be stale"""
+    reason = stale_reason()
+    if reason:
+        logger.info(f"Recounting feature histograms from student_profiles: {reason}")
+        rebuild_histograms()
+
+    live = {}
+    for feature, value, count in db.session.query(FeatureHistogram.feature, FeatureHistogram.value, FeatureHistogram.count):
+        if count:
+            live.setdefault(feature, {})[value] = count
+    return live
+
+def drift_report(model):
+    """Drift of the live profiles from a loaded model's training data, worst features first"""
+    features = drift_scores(model.drift_baseline, live_histograms())
+    ranked = sorted(features.items(), key=lambda item: item[1]['psi'], reverse=True)
+    state = db.session.get(FeatureHistogramState, 1)
+    return {
+        'model_version': model.version,
+        'histograms_rebuilt_at': state.rebuilt_at.isoformat() if state and state.rebuilt_at else None,
+        'profiles': max((feature['live_count'] for feature in features.values()), default=0),
+        'max_psi': ranked[0][1]['psi'] if ranked else 0.0,
+        'drifted_features': [attribute for attribute, feature in ranked if feature['status'] in ('moderate', 'significant')],
+        'features': dict(ranked)
+    }
@@ -4,6 +4,7 @@ Simple database initialization script
 """
 
 from app import app, db, User
+from api_migrations import migrate as migrate_api_schema
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
@@ -16,6 +17,10 @@ def init_database():
             db.create_all()
             print("✅ Database tables created successfully!")
             
+            # Existing tables get the columns and indexes added to the models since they were created
+            for change in migrate_api_schema():
+                print(f"✅ Migrated: {change}")
+            
             # Create test users
             print("Creating test users...")
             
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from model.scoring import score_encoded
+
+# Recent queue waits kept for percentile estimates
+WAIT_SAMPLES = 10000
+
+class _Request:
+    __slots__ = ('row', 'model', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, row, model):
+        self.row = row
+        self.model = model
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into batched model calls.
+
+    Callers block in score() while a dispatcher thread collects requests for up to
+    window_ms after the first one arrives, or until max_batch are waiting, scores
+    them with one call per model version and hands each caller its own row.
+    """
+
+    def __init__(self, window_ms=2.0, max_batch=64):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending = []
+        self._condition = threading.Condition()
+        self._thread = None
+
+        self.batches = 0
+        self.requests = 0
+        self.batch_sizes = {}
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+
+    def score(self, row, model):
+        """Score one encoded row with a LoadedModel; returns (score, confidence, category)"""
+        request = _Request(row, model)
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+                self._thread.start()
+            self._pending.append(request)
+            self._condition.notify()
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+
+            # Hold the batch open until the window closes or it is full
+            deadline = self._pending[0].enqueued + self.window
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+
+            # Requests can hold different model versions while a new one is being swapped in
+            groups = {}
+            for request in batch:
+                groups.setdefault(id(request.model), []).append(request)
+
+            for requests in groups.values():
+                try:
+                    raw = np.stack([request.row for request in requests])
+                    predicted_scores, confidence, categories = score_encoded(raw, None, requests[0].model.models)
+                    for i, request in enumerate(requests):
+                        request.result = (float(predicted_scores[i]), float(confidence[i]), int(categories[i]))
+                except Exception as e:
+                    for request in requests:
+                        request.error = e
+
+            with self._condition:
+                self.batches += 1
+                self.requests += len(batch)
+                # Batch sizes are counted in power-of-two buckets
+                bucket = 1 << (len(batch) - 1).bit_length()
+                self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+                self._waits.extend(started - request.enqueued for request in batch)
+
+            for request in batch:
+                request.done.set()
+
+    def stats(self):
+        with self._condition:
+            waits = np.array(self._waits) * 1000
+            batch_sizes = dict(sorted(self.batch_sizes.items()))
+            batches, requests = self.batches, self.requests
+
+        percentiles = np.percentile(waits, [50, 95, 99]).round(3).tolist() if len(waits) else [None] * 3
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'batches': batches,
+            'requests': requests,
+            'mean_batch_size': round(requests / batches, 2) if batches else 0.0,
+            'batch_size_histogram': {f'<={size}': count for size, count in batch_sizes.items()},
+            'queue_wait_ms': dict(zip(('p50', 'p95', 'p99'), percentiles))
+        }
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import struct
+import time
+from datetime import datetime
+import numpy as np
+from model.encoder import FeatureEncoder
+from model.forest import MODEL_DIR, Forest, convert_artifacts
+
+BUNDLE_FILE = 'model.bundle'
+BUNDLE_MAGIC = b'SPMODEL\x00'
+BUNDLE_FORMAT_VERSION = 1
+
+# Arrays start on cache-line boundaries so memory-mapped views are aligned for every dtype
+ALIGNMENT = 64
+
+FOREST_ARRAYS = (
+    'feature', 'threshold', 'children_left', 'children_right', 'children', 'value', 'roots', 'classes',
+    'leaf_index', 'leaf_contributions'
+)
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _checksum(array):
+    return hashlib.sha256(np.ascontiguousarray(array).data).hexdigest()
+
+class ModelBundle:
+    """A model version loaded from a bundle file.
+
+    Layout: magic, manifest length, JSON manifest, then every array at an aligned
+    offset. The arrays are views into one read-only memory map, so all processes
+    on a host that load the same bundle share a single copy of the model pages.
+    """
+
+    def __init__(self, path, manifest, encoder, classifier, regressor):
+        self.path = path
+        self.manifest = manifest
+        self.encoder = encoder
+        self.classifier = classifier
+        self.regressor = regressor
+
+    @property
+    def version(self):
+        return self.manifest['model_version']
+
+    @property
+    def models(self):
+        return self.encoder, self.classifier, self.regressor
+
+    @property
+    def feature_importance(self):
+        return self.manifest.get('feature_importance')
+
+    @property
+    def drift_baseline(self):
+        return self.manifest.get('drift_baseline')
+
+def forest_nbytes(forest):
+    """Bytes a forest's arrays take in a bundle, contribution tables included"""
+    forest.contribution_tables()
+    return sum(getattr(forest, field).nbytes for field in FOREST_ARRAYS if getattr(forest, field) is not None)
+
+def write_bundle(path, encoder, classifier, regressor, feature_importance=None, drift_baseline=None):
+    """Write the encoder and both forests to a single bundle file, replacing it atomically.
+
+    drift_baseline holds the training data's feature histograms from model.drift.
+    """
+    arrays = {}
+    forests = {}
+    for name, forest in (('classifier', classifier), ('regressor', regressor)):
+        forests[name] = {'max_depth': forest.max_depth, 'n_features': forest.n_features}
+        # Explanation tables are stored too, so explaining needs no per-process precomputation
+        forest.contribution_tables()
+        for field in FOREST_ARRAYS:
+            array = getattr(forest, field)
+            if array is not None:
+                arrays[f'{name}.{field}'] = np.ascontiguousarray(array)
+
+    entries = {}
+    offset = 0
+    for key, array in arrays.items():
+        if array.dtype.hasobject:
+            raise ValueError(f"Array {key} has dtype {array.dtype}, which cannot be memory-mapped")
+        offset = _align(offset)
+        entries[key] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': array.nbytes,
+            'sha256': _checksum(array)
+        }
+        offset += array.nbytes
+
+    # The version is derived from the content, so identical models get identical versions
+    encoder_json = json.dumps(encoder.to_dict(), sort_keys=True)
+    digest = hashlib.sha256(encoder_json.encode('utf-8'))
+    for key in sorted(entries):
+        digest.update(key.encode('utf-8'))
+        digest.update(entries[key]['sha256'].encode('utf-8'))
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model_version': digest.hexdigest()[:12],
+        'created_at': datetime.utcnow().isoformat(),
+        'encoder': encoder.to_dict(),
+        'forests': forests,
+        'feature_importance': feature_importance,
+        'drift_baseline': drift_baseline,
+        'arrays': entries
+    }
+    manifest_bytes = json.dumps(manifest).encode('utf-8')
+    header = BUNDLE_MAGIC + struct.pack('<Q', len(manifest_bytes)) + manifest_bytes
+    data_start = _align(len(header))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        for key, array in arrays.items():
+            f.seek(data_start + entries[key]['offset'])
+            f.write(array.tobytes())
+    os.replace(temp_path, path)
+    return manifest
+
+def read_manifest(path):
+    """Read a bundle's manifest without touching its arrays; returns (manifest, data offset)"""
+    with open(path, 'rb') as f:
+        if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+            raise ValueError(f"{path} is not a model bundle")
+        (length,) = struct.unpack('<Q', f.read(8))
+        manifest = json.loads(f.read(length).decode('utf-8'))
+
+    if manifest['format_version'] != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version: {manifest['format_version']}")
+    return manifest, _align(len(BUNDLE_MAGIC) + 8 + length)
+
+def load_bundle(path, verify=True):
+    """Memory-map a bundle file; verify recomputes every array checksum"""
+    manifest, data_start = read_manifest(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+
+    arrays = {}
+    for key, entry in manifest['arrays'].items():
+        start = data_start + entry['offset']
+        array = buffer[start:start + entry['nbytes']].view(np.dtype(entry['dtype'])).reshape(entry['shape'])
+        if verify and _checksum(array) != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for {key} in {path}")
+        arrays[key] = array
+
+    forests = {}
+    for name, meta in manifest['forests'].items():
+        fields = {field: arrays.get(f'{name}.{field}') for field in FOREST_ARRAYS}
+        forests[name] = Forest(
+            fields['feature'],
+            fields['threshold'],
+            fields['children_left'],
+            fields['children_right'],
+            fields['value'],
+            fields['roots'],
+            meta['max_depth'],
+            meta['n_features'],
+            classes=fields['classes'],
+            children=fields['children'],
+            leaf_index=fields['leaf_index'],
+            leaf_contributions=fields['leaf_contributions']
+        )
+
+    encoder = FeatureEncoder.from_dict(manifest['encoder'])
+    return ModelBundle(path, manifest, encoder, forests['classifier'], forests['regressor'])
+
+def build_bundle(model_dir=MODEL_DIR, path=None):
+    """Convert the pickled artifacts in model_dir into a single bundle file"""
+    import joblib
+    import pandas as pd
+    from model.drift import baseline_histograms
+
+    encoder, classifier, regressor = convert_artifacts(model_dir)
+    importance = joblib.load(os.path.join(model_dir, 'feature_importance.pkl'))
+    feature_importance = [
+        {'feature': str(row['feature']), 'importance': float(row['importance'])}
+        for row in importance.to_dict('records')
+    ]
+    dataset = os.path.join(model_dir, 'cleaned_dataset.csv')
+    drift_baseline = baseline_histograms(pd.read_csv(dataset)) if os.path.exists(dataset) else None
+    path = path or os.path.join(model_dir, BUNDLE_FILE)
+    write_bundle(path, encoder, classifier, regressor, feature_importance, drift_baseline)
+    return path
+
+if __name__ == "__main__":
+    path = build_bundle()
+    start = time.perf_counter()
+    bundle = load_bundle(path)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"✅ Wrote model bundle {bundle.version} to {path} "
+          f"({os.path.getsize(path) / 1e6:.1f} MB, loads and verifies in {elapsed:.1f} ms)")
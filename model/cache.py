@@ -0,0 +1,59 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+def feature_fingerprint(encoded_row, model_version):
+    """Stable hash of an encoded feature vector together with the model version"""
+    digest = hashlib.sha1(encoded_row)
+    digest.update(str(model_version).encode('utf-8'))
+    return digest.hexdigest()
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate):
+        """Drop every entry whose key matches the predicate"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,220 @@
+"""Shrink the serving forests and report what each size costs in accuracy and latency.
+
+    python -m model.compress [--bundle model_data/model.bundle] [--report compression_report.json]
+    python -m model.compress --trees 40 --depth 8 --output model_data/compact.bundle
+
+Trees are ranked by greedy forward selection on half of the notebook's test splits,
+so the first k trees are the k that work best together; the other half measures
+accuracy. Deep nodes are pruned by collapsing every node at the depth limit into
+a leaf. Thresholds and node values are stored as float32; each threshold is
+rounded down to the largest float32 not above it, which keeps every decision on
+float32 features identical.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+from model.bundle import BUNDLE_FILE, forest_nbytes, load_bundle, write_bundle
+from model.forest import MODEL_DIR, Forest
+from model.scoring import score_categories
+from model.train import PERFORMANCE_THRESHOLDS
+from model.update import evaluate, original_test_split
+
+TREE_COUNTS = (5, 10, 20, 30, 50, 75, 100)
+DEPTH_CUTS = (0, 1, 2, 3)
+
+LATENCY_REPEATS = 200
+THROUGHPUT_ROWS = 10000
+
+def float32_thresholds(threshold):
+    """Largest float32 values not above each float64 threshold"""
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+def prune_forest(forest, trees, max_depth=None, compact=True):
+    """A forest of the given trees, cut to max_depth, with float32 thresholds and values if compact"""
+    limit = forest.max_depth if max_depth is None else min(max_depth, forest.max_depth)
+    nodes = np.arange(forest.n_nodes)
+    is_leaf = forest.children_left == nodes
+
+    # Walk the chosen trees level by level, recording the depth of every reachable node
+    depth = np.full(forest.n_nodes, -1, dtype=np.intp)
+    level = forest.roots[np.sort(trees)].astype(np.intp)
+    for current in range(limit + 1):
+        depth[level] = current
+        level = level[~is_leaf[level]]
+        level = np.concatenate([forest.children_left[level], forest.children_right[level]]).astype(np.intp)
+
+    # Trees occupy contiguous node ranges with the root first, so keeping node order keeps trees contiguous
+    kept = np.flatnonzero(depth >= 0)
+    new_index = np.full(forest.n_nodes, -1, dtype=np.int32)
+    new_index[kept] = np.arange(len(kept), dtype=np.int32)
+    leaf = is_leaf[kept] | (depth[kept] == limit)
+    index = np.arange(len(kept), dtype=np.int32)
+
+    threshold = np.where(leaf, 0.0, forest.threshold[kept])
+    value = forest.value[kept]
+    if compact:
+        threshold = float32_thresholds(threshold.astype(np.float64))
+        value = value.astype(np.float32)
+
+    return Forest(
+        np.where(leaf, 0, forest.feature[kept]),
+        threshold,
+        np.where(leaf, index, new_index[forest.children_left[kept]]),
+        np.where(leaf, index, new_index[forest.children_right[kept]]),
+        value,
+        new_index[forest.roots[np.sort(trees)]],
+        limit,
+        forest.n_features,
+        forest.classes
+    )
+
+def tree_outputs(forest, X):
+    """Every tree's leaf value for every row, shape (trees, rows, outputs)"""
+    return forest.value[forest.apply(X)].transpose(1, 0, 2)
+
+def rank_trees(outputs, target, classes=None):
+    """Order trees by greedy forward selection on a selection set.
+
+    Classifiers maximize accuracy of the averaged probabilities, with the total
+    probability of the true class breaking ties; regressors minimize squared error.
+    """
+    remaining = list(range(len(outputs)))
+    total = np.zeros(outputs.shape[1:], dtype=np.float64)
+    order = []
+    if classes is not None:
+        target_index = np.searchsorted(classes, target)
+        rows = np.arange(len(target))
+
+    while remaining:
+        candidates = total[None] + outputs[remaining]
+        if classes is not None:
+            correct = (candidates.argmax(axis=2) == target_index).sum(axis=1)
+            margin = candidates[:, rows, target_index].sum(axis=1) / (len(order) + 1)
+            best = int(np.lexsort((-margin, -correct))[0])
+        else:
+            error = ((candidates[:, :, 0] / (len(order) + 1) - target) ** 2).sum(axis=1)
+            best = int(np.argmin(error))
+        total += outputs[remaining[best]]
+        order.append(remaining.pop(best))
+    return np.array(order)
+
+def measure_latency(models, raw):
+    """Single-row p50/p99 latency in ms and batch throughput in rows per second"""
+    encoder, classifier, regressor = models
+
+    def score(rows):
+        classifier_input, regressor_input = encoder.scale(rows)
+        classifier.predict_proba(classifier_input)
+        regressor.predict(regressor_input)
+
+    timings = []
+    for i in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        score(raw[i % len(raw):i % len(raw) + 1])
+        timings.append((time.perf_counter() - start) * 1000)
+
+    batch = raw[np.arange(THROUGHPUT_ROWS) % len(raw)]
+    start = time.perf_counter()
+    score(batch)
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(timings, [50, 99])
+    return {'p50_ms': round(float(p50), 4), 'p99_ms': round(float(p99), 4), 'rows_per_sec': round(THROUGHPUT_ROWS / elapsed)}
+
+def _halves(data):
+    raw, scores = data
+    half = len(raw) // 2
+    return (raw[:half], scores[:half]), (raw[half:], scores[half:])
+
+def compression_curve(bundle, classifier_data, regressor_data, tree_counts=TREE_COUNTS, depth_cuts=DEPTH_CUTS):
+    """Accuracy, size and latency for every (tree count, depth) combination.
+
+    Each (raw, scores) holdout is halved: the first half ranks the trees, the
+    second measures the compressed models. Sizes count every array a bundle
+    stores, contribution tables included.
+    """
+    encoder, classifier, regressor = bundle.models
+    classifier_select, classifier_test = _halves(classifier_data)
+    regressor_select, regressor_test = _halves(regressor_data)
+
+    classifier_order = rank_trees(
+        tree_outputs(classifier, encoder.scale(classifier_select[0])[0]),
+        score_categories(classifier_select[1], PERFORMANCE_THRESHOLDS),
+        classifier.classes
+    )
+    regressor_order = rank_trees(tree_outputs(regressor, encoder.scale(regressor_select[0])[1]), regressor_select[1])
+
+    baseline = {
+        'trees': classifier.n_trees, 'max_depth': classifier.max_depth,
+        'bytes': forest_nbytes(classifier) + forest_nbytes(regressor)
+    }
+    baseline.update(evaluate(bundle.models, classifier_test, regressor_test))
+    baseline.update(measure_latency(bundle.models, classifier_test[0]))
+
+    points = []
+    for trees in tree_counts:
+        if trees > min(classifier.n_trees, regressor.n_trees):
+            continue
+        for cut in depth_cuts:
+            max_depth = max(1, classifier.max_depth - cut)
+            models = (
+                encoder,
+                prune_forest(classifier, classifier_order[:trees], max_depth),
+                prune_forest(regressor, regressor_order[:trees], max_depth)
+            )
+            point = {'trees': trees, 'max_depth': max_depth, 'bytes': forest_nbytes(models[1]) + forest_nbytes(models[2])}
+            point.update(evaluate(models, classifier_test, regressor_test))
+            point.update(measure_latency(models, classifier_test[0]))
+            points.append(point)
+    return baseline, points, (classifier_order, regressor_order)
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and quantize the serving forests")
+    parser.add_argument('--bundle', default=os.path.join(MODEL_DIR, BUNDLE_FILE))
+    parser.add_argument('--data', default=os.path.join(MODEL_DIR, 'cleaned_dataset.csv'),
+                        help="Dataset whose original test split is used for tree selection and evaluation")
+    parser.add_argument('--report', default='compression_report.json')
+    parser.add_argument('--trees', type=int, help="Trees per forest to keep in the written bundle")
+    parser.add_argument('--depth', type=int, help="Maximum depth of the written bundle")
+    parser.add_argument('--output', help="Write a compressed bundle with --trees and --depth to this path")
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.bundle)
+    classifier_data, regressor_data = original_test_split(bundle.encoder, args.data)
+    baseline, points, (classifier_order, regressor_order) = compression_curve(bundle, classifier_data, regressor_data)
+
+    # Float32 thresholds must not change a single decision at full size
+    exact = prune_forest(bundle.classifier, np.arange(bundle.classifier.n_trees))
+    classifier_input, _ = bundle.encoder.scale(classifier_data[0])
+    identical = bool(np.array_equal(exact.apply(classifier_input), bundle.classifier.apply(classifier_input)))
+
+    report = {'base_version': bundle.version, 'float32_decisions_identical': identical, 'baseline': baseline, 'curve': points}
+
+    print(f"{'trees':>5} {'depth':>5} {'size MB':>8} {'accuracy':>8} {'rmse':>7} {'p50 ms':>7} {'rows/s':>9}")
+    for point in [baseline] + points:
+        print(f"{point['trees']:>5} {point['max_depth']:>5} {point['bytes'] / 1e6:>8.2f} {point['accuracy']:>8.4f} "
+              f"{point['rmse']:>7.3f} {point['p50_ms']:>7.3f} {point['rows_per_sec']:>9}")
+
+    if args.output:
+        trees = args.trees or bundle.classifier.n_trees
+        models = (
+            bundle.encoder,
+            prune_forest(bundle.classifier, classifier_order[:trees], args.depth),
+            prune_forest(bundle.regressor, regressor_order[:trees], args.depth)
+        )
+        manifest = write_bundle(args.output, *models, bundle.feature_importance, bundle.drift_baseline)
+        report['output'] = {'path': args.output, 'model_version': manifest['model_version'],
+                            'size_bytes': os.path.getsize(args.output)}
+        print(f"✅ Wrote compressed bundle {manifest['model_version']} to {args.output} "
+              f"({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import itertools
+import numpy as np
+
+AT_RISK = 0
+
+# Actionable features: (profile attribute, model column, candidate deltas, allowed range)
+ACTIONABLE_FEATURES = [
+    ('hours_studied', 'Hours_Studied', range(0, 21), (0, 44)),
+    ('attendance', 'Attendance', range(0, 41), (0, 100)),
+    ('tutoring_sessions', 'Tutoring_Sessions', range(0, 5), (0, 8)),
+    ('sleep_hours', 'Sleep_Hours', range(-2, 4), (4, 10)),
+]
+
+# Candidates scored per student per model call; results come in cost order, so
+# a student stops being scored once enough cheap paths have been found
+CANDIDATE_BATCH = 256
+
+# Rows per model call when searching a cohort
+MAX_BATCH_ROWS = 1 << 17
+
+# Non-dominated paths returned per student
+MAX_PATHS = 3
+
+class CounterfactualSearch:
+    """Finds the cheapest changes to actionable features that lift students out of "At Risk".
+
+    Every combination of feature deltas is enumerated once and sorted by cost, the
+    L1 distance in standard deviations of the training data. Students are then
+    scored against consecutive slices of that ordering, many students and many
+    candidates per model call. The first passing candidates found for a student
+    are therefore its cheapest, and the student drops out of later calls as soon
+    as MAX_PATHS non-dominated paths are known.
+    """
+
+    def __init__(self, models, max_paths=MAX_PATHS, candidate_batch=CANDIDATE_BATCH):
+        if models is None:
+            raise ValueError('Counterfactual search needs the exported models')
+        self.encoder, self.classifier, self.regressor = models
+        self.max_paths = max_paths
+        self.candidate_batch = candidate_batch
+
+        self.attributes = [attribute for attribute, _, _, _ in ACTIONABLE_FEATURES]
+        self.indices = np.array([self.encoder.feature_names.index(column) for _, column, _, _ in ACTIONABLE_FEATURES])
+        self.bounds = np.array([bounds for _, _, _, bounds in ACTIONABLE_FEATURES], dtype=np.float32)
+
+        deltas = np.array(list(itertools.product(*(steps for _, _, steps, _ in ACTIONABLE_FEATURES))), dtype=np.float32)
+        deltas = deltas[np.any(deltas != 0, axis=1)]
+        costs = np.abs(deltas / self.encoder.scales[0][self.indices]).sum(axis=1)
+        order = np.argsort(costs, kind='stable')
+        self.deltas = deltas[order]
+        self.costs = costs[order]
+
+    def _passing(self, raw):
+        classifier_input, _ = self.encoder.scale(raw)
+        probabilities = self.classifier.predict_proba(classifier_input)
+        categories = self.classifier.classes[probabilities.argmax(axis=1)]
+        return categories != AT_RISK, categories, probabilities.max(axis=1)
+
+    def search(self, raw):
+        """Search paths for every encoded row; returns one list of paths per row.
+
+        Rows that are not currently at risk get None instead of a list.
+        """
+        raw = np.asarray(raw, dtype=np.float32)
+        passing, _, _ = self._passing(raw)
+        results = [None if already else [] for already in passing]
+        found = [[] for _ in range(len(raw))]
+        active = np.flatnonzero(~passing)
+
+        students_per_call = max(1, MAX_BATCH_ROWS // self.candidate_batch)
+        for start in range(0, len(self.deltas), self.candidate_batch):
+            if len(active) == 0:
+                break
+            deltas = self.deltas[start:start + self.candidate_batch]
+
+            still_active = []
+            for chunk_start in range(0, len(active), students_per_call):
+                chunk = active[chunk_start:chunk_start + students_per_call]
+                values = raw[chunk][:, None, self.indices] + deltas[None, :, :]
+                feasible = np.all((values >= self.bounds[:, 0]) & (values <= self.bounds[:, 1]), axis=2)
+
+                candidates = np.repeat(raw[chunk][:, None, :], len(deltas), axis=1)
+                candidates[:, :, self.indices] = values
+                ok, categories, confidence = self._passing(candidates.reshape(-1, raw.shape[1]))
+                ok = ok.reshape(feasible.shape) & feasible
+                categories = categories.reshape(feasible.shape)
+                confidence = confidence.reshape(feasible.shape)
+
+                for row, student in enumerate(chunk):
+                    for candidate in np.flatnonzero(ok[row]):
+                        self._keep(found[student], start + candidate, categories[row, candidate], confidence[row, candidate])
+                        if len(found[student]) >= self.max_paths:
+                            break
+                    if len(found[student]) < self.max_paths:
+                        still_active.append(student)
+            active = np.array(still_active, dtype=np.intp)
+
+        for student, paths in enumerate(found):
+            if results[student] is not None:
+                results[student] = self._describe(raw[student], paths)
+        return results
+
+    def _keep(self, paths, candidate, category, confidence):
+        """Add a passing candidate unless a cheaper kept path already changes less in the same direction"""
+        delta = self.deltas[candidate]
+        for kept, _, _ in paths:
+            other = self.deltas[kept]
+            if np.all((other == 0) | ((np.sign(other) == np.sign(delta)) & (np.abs(delta) >= np.abs(other)))):
+                return
+        paths.append((candidate, category, confidence))
+
+    def _describe(self, row, paths):
+        if not paths:
+            return []
+        candidates = np.repeat(row[None, :], len(paths), axis=0)
+        candidates[:, self.indices] += self.deltas[[candidate for candidate, _, _ in paths]]
+        _, regressor_input = self.encoder.scale(candidates)
+        predicted_scores = np.clip(self.regressor.predict(regressor_input), 0, 100)
+
+        described = []
+        for (candidate, category, confidence), predicted_score in zip(paths, predicted_scores):
+            delta = self.deltas[candidate]
+            described.append({
+                'changes': {
+                    attribute: {'from': float(row[index]), 'to': float(row[index] + change)}
+                    for attribute, index, change in zip(self.attributes, self.indices, delta) if change != 0
+                },
+                'cost': round(float(self.costs[candidate]), 4),
+                'performance_category': int(category),
+                'confidence_level': float(confidence),
+                'predicted_score': float(predicted_score)
+            })
+        return described
@@ -0,0 +1,103 @@
+import math
+import numpy as np
+import pandas as pd
+from model.scoring import PROFILE_FEATURES
+
+# Quantile bins per numeric feature in the baseline
+DRIFT_BINS = 10
+
+# Population stability index bands
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Fewer live profiles than this give a noisy score
+MIN_DRIFT_SAMPLES = 30
+
+# Floor for empty bins so the index stays finite
+PSI_EPSILON = 1e-4
+
+def value_key(value):
+    """Canonical string under which a profile value is counted; missing values map to ''"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        number = float(value)
+        return str(int(number)) if number.is_integer() else repr(number)
+    return str(value)
+
+def baseline_histograms(df):
+    """Histograms of every profile feature in a training DataFrame, stored with the model.
+
+    Numeric features get up to DRIFT_BINS quantile bins, categorical features one
+    bin per category plus one for unseen values; the last bin counts missing values.
+    """
+    baseline = {}
+    for attribute, column in PROFILE_FEATURES:
+        values = df[column]
+        missing = int(values.isna().sum())
+        present = values.dropna()
+        if pd.api.types.is_numeric_dtype(values):
+            quantiles = np.quantile(present.to_numpy(dtype=np.float64), np.linspace(0, 1, DRIFT_BINS + 1)[1:-1])
+            edges = np.unique(quantiles)
+            counts = np.bincount(np.searchsorted(edges, present.to_numpy(dtype=np.float64), side='right'),
+                                 minlength=len(edges) + 1)
+            baseline[attribute] = {'kind': 'numeric', 'edges': edges.tolist(), 'counts': counts.tolist() + [missing]}
+        else:
+            categories = sorted(present.astype(str).unique())
+            counts = present.astype(str).value_counts()
+            baseline[attribute] = {
+                'kind': 'categorical',
+                'categories': categories,
+                'counts': [int(counts[category]) for category in categories] + [0, missing]
+            }
+    return baseline
+
+def bin_counts(spec, value_counts):
+    """Fold live counts keyed by value_key into the bins of a baseline histogram"""
+    counts = np.zeros(len(spec['counts']), dtype=np.int64)
+    missing = len(counts) - 1
+    if spec['kind'] == 'numeric':
+        edges = np.asarray(spec['edges'], dtype=np.float64)
+        for key, count in value_counts.items():
+            try:
+                counts[np.searchsorted(edges, float(key), side='right') if key != '' else missing] += count
+            except ValueError:
+                counts[missing] += count
+    else:
+        index = {category: i for i, category in enumerate(spec['categories'])}
+        unseen = len(spec['categories'])
+        for key, count in value_counts.items():
+            counts[missing if key == '' else index.get(key, unseen)] += count
+    return counts
+
+def population_stability(expected, actual):
+    """Population stability index between two histograms over the same bins"""
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.maximum(expected / max(expected.sum(), 1), PSI_EPSILON)
+    actual = np.maximum(actual / max(actual.sum(), 1), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def drift_status(psi, samples):
+    if samples < MIN_DRIFT_SAMPLES:
+        return 'insufficient_data'
+    if psi >= PSI_SIGNIFICANT:
+        return 'significant'
+    if psi >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+def drift_scores(baseline, live):
+    """Per-feature drift of live value counts ({attribute: {value_key: count}}) from a baseline"""
+    features = {}
+    for attribute, spec in baseline.items():
+        counts = bin_counts(spec, live.get(attribute, {}))
+        psi = population_stability(spec['counts'], counts)
+        features[attribute] = {
+            'psi': round(psi, 4),
+            'status': drift_status(psi, int(counts.sum())),
+            'live_count': int(counts.sum()),
+            'live_histogram': counts.tolist(),
+            'baseline_histogram': spec['counts']
+        }
+    return features
@@ -0,0 +1,116 @@
+import numpy as np
+
+class FeatureEncoder:
+    """Precompiled categorical encoding and scaling for the classifier and regressor.
+
+    Built once from the fitted label encoders and the two scalers. Categories are
+    resolved through plain dict lookups and both scalers are applied with a single
+    fused multiply-subtract, so no pandas objects are created per prediction.
+    """
+
+    def __init__(self, feature_names, categories, classifier_scaling, regressor_scaling):
+        self.feature_names = list(feature_names)
+        self.categories = {column: list(classes) for column, classes in categories.items()}
+
+        # Dense lookup tables from category string to label code
+        self.lookup = {
+            column: {str(category): code for code, category in enumerate(classes)}
+            for column, classes in self.categories.items()
+        }
+        self.column_kinds = [column in self.lookup for column in self.feature_names]
+
+        # Fused scaling: scaled = raw * inv_scale - offset, one row per model
+        self.means = np.array([classifier_scaling[0], regressor_scaling[0]], dtype=np.float64)
+        self.scales = np.array([classifier_scaling[1], regressor_scaling[1]], dtype=np.float64)
+        self.inv_scale = 1.0 / self.scales
+        self.offset = self.means / self.scales
+
+    @classmethod
+    def from_artifacts(cls, label_encoders, scaler_classifier, scaler_regressor):
+        """Compile an encoder from the fitted sklearn preprocessing objects"""
+        categories = {column: encoder.classes_ for column, encoder in label_encoders.items()}
+        return cls(
+            scaler_classifier.feature_names_in_,
+            categories,
+            (scaler_classifier.mean_, scaler_classifier.scale_),
+            (scaler_regressor.mean_, scaler_regressor.scale_)
+        )
+
+    def to_dict(self):
+        """Plain-data representation that can be stored without pickle"""
+        return {
+            'feature_names': self.feature_names,
+            'categories': {column: [str(c) for c in classes] for column, classes in self.categories.items()},
+            'classifier_scaling': [self.means[0].tolist(), self.scales[0].tolist()],
+            'regressor_scaling': [self.means[1].tolist(), self.scales[1].tolist()]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['feature_names'], data['categories'], data['classifier_scaling'], data['regressor_scaling'])
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def encode_value(self, column, value):
+        """Encode a single categorical value, falling back to the first class when unseen"""
+        return self.lookup[column].get(str(value), 0)
+
+    def encode_column(self, column, values):
+        """Encode a whole column of values into a float32 array of raw codes"""
+        if column in self.lookup:
+            values = np.asarray(values, dtype=object)
+            if len(values) == 0:
+                return np.empty(0, dtype=np.float32)
+            # Only resolve each distinct category once
+            uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+            codes = np.array([self.encode_value(column, value) for value in uniques], dtype=np.float32)
+            return codes[inverse.reshape(-1)]
+
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float32)
+
+    def encode(self, data):
+        """Encode a dict, a list of dicts or a column-oriented batch into raw feature codes.
+
+        Returns a float32 array of shape (rows, features) in model column order.
+        Missing numeric values are left as NaN and become the training mean after scaling.
+        """
+        if isinstance(data, dict):
+            first = data.get(self.feature_names[0])
+            if isinstance(first, (list, tuple, np.ndarray)):
+                return self._encode_columns(data)
+            return self._encode_rows([data])
+        return self._encode_rows(data)
+
+    def _encode_rows(self, rows):
+        raw = np.empty((len(rows), self.n_features), dtype=np.float32)
+        for i, row in enumerate(rows):
+            raw[i] = [
+                self.encode_value(column, row.get(column)) if is_categorical
+                else np.nan if row.get(column) is None else row[column]
+                for column, is_categorical in zip(self.feature_names, self.column_kinds)
+            ]
+        return raw
+
+    def _encode_columns(self, columns):
+        size = len(columns[self.feature_names[0]])
+        raw = np.empty((size, self.n_features), dtype=np.float32)
+        for j, column in enumerate(self.feature_names):
+            values = columns.get(column)
+            if values is None:
+                raw[:, j] = 0 if self.column_kinds[j] else np.nan
+            else:
+                raw[:, j] = self.encode_column(column, values)
+        return raw
+
+    def scale(self, raw):
+        """Apply both scalers to raw codes, returning (classifier_input, regressor_input)"""
+        # Scale in float64 so the float32 result matches the sklearn scalers bit for bit
+        scaled = (raw[None, :, :] * self.inv_scale[:, None, :] - self.offset[:, None, :]).astype(np.float32)
+        np.nan_to_num(scaled, copy=False, nan=0.0)
+        return scaled[0], scaled[1]
+
+    def transform(self, data):
+        """Encode and scale input data into ready-to-score float32 arrays for both models"""
+        return self.scale(self.encode(data))
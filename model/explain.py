@@ -0,0 +1,58 @@
+import numpy as np
+from model.scoring import PERFORMANCE_LABELS, PROFILE_FEATURES
+
+# Model columns reported under profile attribute names; the derived activity level
+# column is folded into physical_activity since both come from the same input
+COLUMN_ATTRIBUTES = {column: attribute for attribute, column in PROFILE_FEATURES}
+COLUMN_ATTRIBUTES['Physical_Activity.1'] = 'physical_activity'
+
+def explain_encoded(raw, models):
+    """Predictions and per-feature contributions for rows encoded with encode_batch.
+
+    Category contributions are for the predicted class's probability, score
+    contributions for the predicted score. Each prediction equals its bias plus
+    the sum of its contributions, before the score is clipped to 0-100.
+    """
+    encoder, classifier, regressor = models
+    classifier_input, regressor_input = encoder.scale(raw)
+
+    probabilities, class_contributions = classifier.predict_contributions(classifier_input)
+    score_values, score_contributions = regressor.predict_contributions(regressor_input)
+    score_contributions = score_contributions[:, :, 0]
+
+    predicted = probabilities.argmax(axis=1)
+    rows = np.arange(len(raw))
+
+    # Merge columns that map to the same profile attribute
+    attributes = list(dict.fromkeys(COLUMN_ATTRIBUTES[column] for column in encoder.feature_names))
+    merge = np.zeros((len(encoder.feature_names), len(attributes)))
+    for index, column in enumerate(encoder.feature_names):
+        merge[index, attributes.index(COLUMN_ATTRIBUTES[column])] = 1.0
+
+    return {
+        'attributes': attributes,
+        'categories': classifier.classes[predicted],
+        'confidence': probabilities[rows, predicted],
+        'category_bias': classifier.bias[predicted],
+        'category_contributions': class_contributions[rows, :, predicted] @ merge,
+        'predicted_scores': np.clip(score_values[:, 0], 0, 100),
+        'score_bias': float(regressor.bias[0]),
+        'score_contributions': score_contributions @ merge
+    }
+
+def explanation_to_dict(explanation, index, top=None):
+    """Serialize one row of explain_encoded output, largest contributions first"""
+    def ranked(contributions):
+        order = np.argsort(-np.abs(contributions), kind='stable')[:top]
+        return [{'feature': explanation['attributes'][i], 'contribution': round(float(contributions[i]), 6)}
+                for i in order]
+
+    return {
+        'performance_category': PERFORMANCE_LABELS.get(int(explanation['categories'][index]), 'Unknown'),
+        'confidence_level': float(explanation['confidence'][index]),
+        'category_bias': float(explanation['category_bias'][index]),
+        'category_contributions': ranked(explanation['category_contributions'][index]),
+        'predicted_score': float(explanation['predicted_scores'][index]),
+        'score_bias': explanation['score_bias'],
+        'score_contributions': ranked(explanation['score_contributions'][index])
+    }
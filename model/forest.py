@@ -0,0 +1,238 @@
+import os
+import numpy as np
+from model.encoder import FeatureEncoder
+
+MODEL_DIR = os.environ.get('MODEL_PATH', 'model_data')
+
+# Upper bound on rows * trees evaluated at once, to keep traversal buffers small
+TRAVERSAL_BLOCK = 1 << 20
+
+class Forest:
+    """Random forest flattened into contiguous NumPy arrays.
+
+    All trees share one set of node arrays. Leaves point back to themselves, so a
+    batch is evaluated by stepping every (row, tree) pair max_depth times with
+    vectorized gathers instead of walking Python tree objects.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right, value, roots, max_depth, n_features,
+                 classes=None, children=None, leaf_index=None, leaf_contributions=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold)
+        self.children_left = np.ascontiguousarray(children_left, dtype=np.int32)
+        self.children_right = np.ascontiguousarray(children_right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.classes = None if classes is None else np.asarray(classes)
+
+        # Interleaved (right, left) children so one gather picks the next node: 2 * node + go_left.
+        # Bundles store it precomputed so a memory-mapped forest needs no private copy.
+        if children is None:
+            children = np.stack([self.children_right, self.children_left], axis=1).ravel()
+        self.children = np.ascontiguousarray(children, dtype=np.intp)
+
+        # Per-leaf feature contribution tables, built on first use unless loaded from a bundle
+        self.leaf_index = leaf_index
+        self.leaf_contributions = leaf_contributions
+
+    @property
+    def is_classifier(self):
+        return self.classes is not None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        """Bytes of every array the forest holds, contribution tables included once built"""
+        arrays = [
+            self.feature, self.threshold, self.children_left, self.children_right, self.children, self.value,
+            self.roots, self.classes, self.leaf_index, self.leaf_contributions
+        ]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    @classmethod
+    def from_sklearn(cls, estimator):
+        """Flatten a fitted RandomForestClassifier or RandomForestRegressor"""
+        is_classifier = hasattr(estimator, 'classes_')
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for tree in estimator.estimators_:
+            tree_ = tree.tree_
+            size = tree_.node_count
+            index = np.arange(offset, offset + size, dtype=np.int32)
+            is_leaf = tree_.children_left < 0
+
+            # Leaves loop back to themselves so traversal can run a fixed number of steps
+            lefts.append(np.where(is_leaf, index, tree_.children_left + offset))
+            rights.append(np.where(is_leaf, index, tree_.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree_.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree_.threshold))
+
+            if is_classifier:
+                node_value = tree_.value[:, 0, :]
+                values.append(node_value / node_value.sum(axis=1, keepdims=True))
+            else:
+                values.append(tree_.value[:, 0, :1])
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree_.max_depth)
+            offset += size
+
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds),
+            np.concatenate(lefts),
+            np.concatenate(rights),
+            np.concatenate(values),
+            roots,
+            max_depth,
+            estimator.n_features_in_,
+            estimator.classes_ if is_classifier else None
+        )
+
+    def replace_trees(self, new_trees, retire):
+        """A new forest without the first retire trees and with the trees of new_trees appended.
+
+        Trees are kept in the order they were added, so the retired ones are the oldest.
+        """
+        if new_trees.n_features != self.n_features or new_trees.is_classifier != self.is_classifier:
+            raise ValueError('Cannot merge forests with different features or model types')
+        retire = min(retire, self.n_trees)
+        start = int(self.roots[retire]) if retire < self.n_trees else self.n_nodes
+        shift = self.n_nodes - start
+
+        value = new_trees.value
+        if self.is_classifier:
+            # New data may not contain every class; align its value columns with ours
+            unknown = np.setdiff1d(new_trees.classes, self.classes)
+            if len(unknown):
+                raise ValueError(f"New trees predict unknown classes: {unknown.tolist()}")
+            value = np.zeros((new_trees.n_nodes, len(self.classes)), dtype=self.value.dtype)
+            value[:, np.searchsorted(self.classes, new_trees.classes)] = new_trees.value
+
+        return Forest(
+            np.concatenate([self.feature[start:], new_trees.feature]),
+            np.concatenate([self.threshold[start:], new_trees.threshold]),
+            np.concatenate([self.children_left[start:] - start, new_trees.children_left + shift]),
+            np.concatenate([self.children_right[start:] - start, new_trees.children_right + shift]),
+            np.concatenate([self.value[start:], value]),
+            np.concatenate([self.roots[retire:] - start, new_trees.roots + shift]),
+            max(self.max_depth, new_trees.max_depth),
+            self.n_features,
+            self.classes
+        )
+
+    @property
+    def bias(self):
+        """Mean root value over all trees, the prediction before any split"""
+        return self.value[self.roots].mean(axis=0)
+
+    def contribution_tables(self):
+        """Per-leaf feature contributions, shape (leaves, features, outputs), and a node-to-row index.
+
+        Following Saabas, every split on the path from the root to a leaf credits
+        its feature with the change in node value it causes. A tree's prediction is
+        its root value plus the leaf's row summed over features.
+        """
+        if self.leaf_contributions is None:
+            nodes = np.arange(self.n_nodes)
+            is_leaf = self.children_left == nodes
+            parent = np.full(self.n_nodes, -1, dtype=np.intp)
+            parent[self.children_left[~is_leaf]] = nodes[~is_leaf]
+            parent[self.children_right[~is_leaf]] = nodes[~is_leaf]
+
+            # Accumulate path contributions level by level, from the roots down
+            contributions = np.zeros((self.n_nodes, self.n_features, self.value.shape[1]), dtype=np.float64)
+            level = self.roots.astype(np.intp)
+            while len(level):
+                level = level[~is_leaf[level]]
+                for child in (self.children_left[level], self.children_right[level]):
+                    contributions[child] = contributions[level]
+                    contributions[child, self.feature[level]] += self.value[child] - self.value[level]
+                level = np.concatenate([self.children_left[level], self.children_right[level]]).astype(np.intp)
+
+            leaf_index = np.full(self.n_nodes, -1, dtype=np.int32)
+            leaf_index[is_leaf] = np.arange(is_leaf.sum(), dtype=np.int32)
+            self.leaf_index = leaf_index
+            self.leaf_contributions = contributions[is_leaf].astype(np.float32)
+        return self.leaf_index, self.leaf_contributions
+
+    def predict_contributions(self, X):
+        """Predicted values and feature contributions from one traversal.
+
+        Returns values shaped like predict_value and contributions averaged over
+        trees, shape (rows, features, outputs); bias + contributions.sum(axis=1)
+        reproduces the values up to float32 rounding.
+        """
+        leaf_index, table = self.contribution_tables()
+        X = np.asarray(X, dtype=np.float32)
+        values = np.empty((len(X), self.value.shape[1]), dtype=np.float64)
+        contributions = np.zeros((len(X), self.n_features, table.shape[2]), dtype=np.float64)
+        block = max(1, TRAVERSAL_BLOCK // max(self.n_trees, 1))
+
+        for start in range(0, len(X), block):
+            leaves = self.apply(X[start:start + block])
+            values[start:start + block] = self.value[leaves].mean(axis=1)
+            rows = leaf_index[leaves]
+            for tree in range(self.n_trees):
+                contributions[start:start + block] += table[rows[:, tree]]
+        return values, contributions / self.n_trees
+
+    def apply(self, X):
+        """Return the leaf reached in every tree for every row, shape (rows, trees)"""
+        # Trees compare float32 features against float64 thresholds, as sklearn does. Compressed
+        # forests round thresholds down to float32, which gives the same decisions for float32
+        # features, so they are compared in float32 without widening.
+        X = np.asarray(X, dtype=np.float32)
+        flat = X.astype(self.threshold.dtype).ravel()
+        row_offsets = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        nodes = np.repeat(self.roots.astype(np.intp)[None, :], len(X), axis=0)
+
+        for _ in range(self.max_depth):
+            go_left = flat.take(row_offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_left)
+        return nodes
+
+    def predict_value(self, X):
+        """Average leaf value over all trees, shape (rows, outputs)"""
+        X = np.asarray(X, dtype=np.float32)
+        result = np.empty((len(X), self.value.shape[1]), dtype=np.float64)
+        block = max(1, TRAVERSAL_BLOCK // max(self.n_trees, 1))
+
+        for start in range(0, len(X), block):
+            leaves = self.apply(X[start:start + block])
+            result[start:start + block] = self.value[leaves].mean(axis=1)
+        return result
+
+    def predict_proba(self, X):
+        return self.predict_value(X)
+
+    def predict(self, X):
+        """Class labels for a classifier, predicted values for a regressor"""
+        values = self.predict_value(X)
+        if self.is_classifier:
+            return self.classes[values.argmax(axis=1)]
+        return values[:, 0]
+
+def convert_artifacts(model_dir=MODEL_DIR):
+    """Load the pickled sklearn models and preprocessing objects as (encoder, classifier, regressor)"""
+    import joblib
+
+    classifier = joblib.load(os.path.join(model_dir, 'rf_performance_classifier.pkl'))
+    regressor = joblib.load(os.path.join(model_dir, 'rf_grade_predictor.pkl'))
+    label_encoders = joblib.load(os.path.join(model_dir, 'label_encoders.pkl'))
+    scaler_classifier = joblib.load(os.path.join(model_dir, 'scaler_classifier.pkl'))
+    scaler_regressor = joblib.load(os.path.join(model_dir, 'scaler_regressor.pkl'))
+
+    encoder = FeatureEncoder.from_artifacts(label_encoders, scaler_classifier, scaler_regressor)
+    return encoder, Forest.from_sklearn(classifier), Forest.from_sklearn(regressor)
@@ -0,0 +1,175 @@
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from model.forest import MODEL_DIR
+from model.registry import load_version
+from model.scoring import score_encoded
+
+# Default number of scoring processes
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', os.cpu_count() or 1))
+
+# Shards per worker; more than one keeps workers busy when shards finish unevenly
+SHARDS_PER_WORKER = 4
+
+# Output columns written by the workers: predicted score, confidence, category
+OUTPUT_COLUMNS = 3
+
+# Model loaded once per worker process by the pool initializer
+_worker_models = None
+_worker_version = None
+
+def _init_worker(model_dir):
+    global _worker_models, _worker_version
+    # Bundles are memory-mapped, so every worker shares the parent's copy of the model pages
+    loaded = load_version(model_dir)
+    _worker_models, _worker_version = loaded.models, loaded.version
+
+def _score_shard(input_name, output_name, shape, start, stop, expected_version=None):
+    """Score rows [start, stop) of the shared input matrix into the shared output matrix"""
+    # A bundle republished in place after the parent loaded it must not be scored
+    # under the parent's version
+    if expected_version is not None and _worker_version != expected_version:
+        raise RuntimeError(f"Scoring worker loaded model {_worker_version}, expected {expected_version}")
+
+    input_memory = shared_memory.SharedMemory(name=input_name)
+    output_memory = shared_memory.SharedMemory(name=output_name)
+    try:
+        raw = np.ndarray(shape, dtype=np.float32, buffer=input_memory.buf)
+        output = np.ndarray((shape[0], OUTPUT_COLUMNS), dtype=np.float64, buffer=output_memory.buf)
+
+        predicted_scores, confidence, categories = score_encoded(raw[start:stop], None, _worker_models)
+        output[start:stop, 0] = predicted_scores
+        output[start:stop, 1] = confidence
+        output[start:stop, 2] = categories
+
+        # Views must be released before the shared memory can be closed
+        del raw, output
+    finally:
+        input_memory.close()
+        output_memory.close()
+    return stop - start
+
+class ShardedScorer:
+    """Scores large encoded feature matrices across a pool of worker processes.
+
+    The matrix is copied once into shared memory and every worker scores its own
+    row range in place, writing into a shared output matrix. Each worker loads the
+    model bundle once, when the pool starts. With a version given, workers refuse
+    to score if the bundle they loaded is a different version.
+    """
+
+    def __init__(self, workers=SCORING_WORKERS, model_dir=MODEL_DIR, version=None):
+        self.workers = workers
+        self.version = version
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(model_dir,)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def warm_up(self):
+        """Start every worker process so model loading is not counted against the first batch"""
+        list(self.executor.map(_noop, range(self.workers)))
+
+    def score(self, raw):
+        """Score an encoded (rows, features) matrix, returning scores, confidence and categories"""
+        raw = np.ascontiguousarray(raw, dtype=np.float32)
+        rows = len(raw)
+        if rows == 0:
+            return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+
+        input_memory = shared_memory.SharedMemory(create=True, size=raw.nbytes)
+        output_memory = shared_memory.SharedMemory(create=True, size=rows * OUTPUT_COLUMNS * 8)
+        try:
+            np.ndarray(raw.shape, dtype=np.float32, buffer=input_memory.buf)[:] = raw
+
+            shard_size = max(1, -(-rows // (self.workers * SHARDS_PER_WORKER)))
+            futures = [
+                self.executor.submit(_score_shard, input_memory.name, output_memory.name, raw.shape,
+                                     start, min(start + shard_size, rows), self.version)
+                for start in range(0, rows, shard_size)
+            ]
+            for future in futures:
+                future.result()
+
+            output = np.ndarray((rows, OUTPUT_COLUMNS), dtype=np.float64, buffer=output_memory.buf).copy()
+        finally:
+            input_memory.close()
+            input_memory.unlink()
+            output_memory.close()
+            output_memory.unlink()
+
+        return output[:, 0], output[:, 1], output[:, 2].astype(np.int64)
+
+def _noop(_):
+    return _worker_models is not None
+
+class ScorerPool:
+    """One long-lived ShardedScorer for the active model version, shared by parallel jobs.
+
+    Jobs check the scorer out for their model version, so worker processes are
+    spawned and load the model once per version instead of once per job. When
+    another version is requested, or the registry swaps models, the current
+    scorer is retired and shut down once the last job using it checks it back in.
+    """
+
+    def __init__(self, workers=SCORING_WORKERS):
+        self.workers = workers
+        self._scorer = None
+        self._users = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self, model):
+        """ShardedScorer for a LoadedModel, started on first use"""
+        retired = None
+        with self._lock:
+            scorer = self._scorer
+            if scorer is None or scorer.version != model.version:
+                retired = self._retire()
+                scorer = self._scorer = ShardedScorer(self.workers, model.model_dir, model.version)
+            self._users[scorer] = self._users.get(scorer, 0) + 1
+        if retired is not None:
+            retired.close()
+
+        try:
+            yield scorer
+        finally:
+            with self._lock:
+                self._users[scorer] -= 1
+                idle = self._users[scorer] == 0 and scorer is not self._scorer
+                if idle:
+                    del self._users[scorer]
+            if idle:
+                scorer.close()
+
+    def _retire(self):
+        """Detach the current scorer; returns it if nobody is using it and it can be closed now"""
+        scorer, self._scorer = self._scorer, None
+        if scorer is not None and self._users.get(scorer, 0) == 0:
+            self._users.pop(scorer, None)
+            return scorer
+        return None
+
+    def on_swap(self, previous, loaded):
+        """Registry swap hook: the next job starts workers for the new version"""
+        with self._lock:
+            retired = self._retire()
+        if retired is not None:
+            retired.close()
+
+    def close(self):
+        self.on_swap(None, None)
@@ -1,39 +1,21 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import pickle
 import warnings
+from model.registry import registry
 
 warnings.filterwarnings('ignore')
 
-@st.cache_resource
+# Start loading the shared model registry as soon as the app imports this module
+registry.preload()
+
 def load_models():
-    """Load all trained models and preprocessing objects"""
+    """Snapshot of the active model version from the shared registry"""
     try:
-        # Load models
-        with open('model_data/rf_performance_classifier.pkl', 'rb') as f:
-            classifier = pickle.load(f)
-        
-        with open('model_data/rf_grade_predictor.pkl', 'rb') as f:
-            regressor = pickle.load(f)
-        
-        # Load preprocessing objects
-        with open('model_data/label_encoders.pkl', 'rb') as f:
-            label_encoders = pickle.load(f)
-        
-        with open('model_data/scaler_classifier.pkl', 'rb') as f:
-            scaler_classifier = pickle.load(f)
-        
-        with open('model_data/scaler_regressor.pkl', 'rb') as f:
-            scaler_regressor = pickle.load(f)
-        
-        with open('model_data/feature_importance.pkl', 'rb') as f:
-            feature_importance = pickle.load(f)
-        
-        return classifier, regressor, label_encoders, scaler_classifier, scaler_regressor, feature_importance
+        return registry.get()
     except Exception as e:
         st.error(f"Error loading models: {str(e)}")
-        return None, None, None, None, None, None
+        return None
 
 @st.cache_data
 def load_data():
@@ -45,42 +27,19 @@ def load_data():
         st.error(f"Error loading data: {str(e)}")
         return None
 
-def preprocess_input(data_dict, label_encoders):
-    """Preprocess input data for prediction"""
-    # Create DataFrame from input
-    df_input = pd.DataFrame([data_dict])
-    
-    # Encode categorical variables
-    for col, encoder in label_encoders.items():
-        if col in df_input.columns:
-            # Handle unseen categories
-            if df_input[col].iloc[0] in encoder.classes_:
-                df_input[col] = encoder.transform([df_input[col].iloc[0]])
-            else:
-                # Use most frequent category for unseen values
-                df_input[col] = encoder.transform([encoder.classes_[0]])
-    
-    return df_input
-
-def make_predictions(input_data, classifier, regressor, label_encoders, scaler_classifier, scaler_regressor):
-    """Make predictions using both models"""
+def make_predictions(input_data, model):
+    """Make predictions using both models of a loaded model version"""
     try:
-        # Preprocess input
-        processed_input = preprocess_input(input_data, label_encoders)
-        
-        # Scale features for classifier
-        scaled_input_classifier = scaler_classifier.transform(processed_input)
+        # Encode and scale features for both models in one pass
+        encoder, classifier, regressor = model.models
+        scaled_input_classifier, scaled_input_regressor = encoder.transform(input_data)
         
-        # Scale features for regressor
-        scaled_input_regressor = scaler_regressor.transform(processed_input)
+        # Get prediction probabilities for classifier and derive the category from them
+        performance_probs = classifier.predict_proba(scaled_input_classifier)[0]
+        performance_category = classifier.classes[performance_probs.argmax()]
         
-        # Make predictions
-        performance_category = classifier.predict(scaled_input_classifier)[0]
         predicted_score = regressor.predict(scaled_input_regressor)[0]
         
-        # Get prediction probabilities for classifier
-        performance_probs = classifier.predict_proba(scaled_input_classifier)[0]
-        
         return performance_category, predicted_score, performance_probs
     except Exception as e:
         st.error(f"Error making predictions: {str(e)}")
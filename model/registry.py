@@ -0,0 +1,147 @@
+import logging
+import os
+import threading
+from datetime import datetime
+import numpy as np
+from model.bundle import BUNDLE_FILE, load_bundle
+from model.forest import MODEL_DIR
+from model.scoring import score_encoded
+
+logger = logging.getLogger(__name__)
+
+# Seconds a request waits for the startup preload before giving up
+MODEL_LOAD_TIMEOUT = float(os.environ.get('MODEL_LOAD_TIMEOUT', 60))
+
+# Recompute bundle checksums when a version is activated
+VERIFY_BUNDLES = os.environ.get('MODEL_VERIFY_BUNDLES', '1') == '1'
+
+class LoadedModel:
+    """One fully loaded model version; never mutated once published"""
+
+    def __init__(self, version, models, model_dir, drift_baseline=None):
+        self.version = version
+        self.models = models
+        self.model_dir = model_dir
+        self.drift_baseline = drift_baseline
+        self.loaded_at = datetime.utcnow()
+
+    @property
+    def is_mock(self):
+        return self.models is None
+
+    def to_dict(self):
+        return {
+            'model_version': self.version,
+            'model_dir': self.model_dir,
+            'loaded_at': self.loaded_at.isoformat()
+        }
+
+def load_version(path):
+    """Load and warm up a model version, falling back to the mock scorer.
+
+    path is a bundle file or a directory containing model.bundle.
+    """
+    bundle_path = path if os.path.isfile(path) else os.path.join(path, BUNDLE_FILE)
+    if not os.path.isfile(bundle_path):
+        logger.warning(f"Model bundle not found in {path} - using mock predictions. "
+                       "Run `python -m model.bundle` to build it")
+        return LoadedModel('mock', None, path)
+
+    bundle = load_bundle(bundle_path, verify=VERIFY_BUNDLES)
+    version, models, drift_baseline = bundle.version, bundle.models, bundle.drift_baseline
+
+    # Score one row so the first real request does not pay for page faults and lazy setup
+    encoder = models[0]
+    score_encoded(np.zeros((1, encoder.n_features), dtype=np.float32), None, models)
+    return LoadedModel(version, models, path, drift_baseline)
+
+class ModelRegistry:
+    """Process-wide holder of the active model version.
+
+    Readers take a snapshot with get() and use it for the whole request, so a
+    swap never changes the model halfway through a prediction. Swapping loads
+    the new version completely before publishing it with a single reference
+    assignment; requests already holding the old version finish on it.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self.error = None
+        self._active = None
+        self._ready = threading.Event()
+        self._swap_lock = threading.Lock()
+        self._listeners = []
+        self._preload_started = False
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set()
+
+    @property
+    def active(self):
+        return self._active
+
+    def on_swap(self, callback):
+        """Register callback(old, new), called after a new version is published"""
+        self._listeners.append(callback)
+
+    def preload(self, background=True):
+        """Load the default model version once per process, optionally in a background thread"""
+        with self._swap_lock:
+            if self._preload_started:
+                return
+            self._preload_started = True
+
+        if background:
+            threading.Thread(target=self._preload, name='model-preload', daemon=True).start()
+        else:
+            self._preload()
+
+    def _preload(self):
+        try:
+            # Only startup falls back to mock predictions when no bundle is found
+            self.activate(self.model_dir, allow_mock=True)
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Model preload error: {e}")
+
+    def get(self, timeout=MODEL_LOAD_TIMEOUT):
+        """Snapshot of the active model, waiting for the startup preload if needed"""
+        if not self._ready.is_set() and self.error:
+            raise RuntimeError(f'Model failed to load: {self.error}')
+        if not self._ready.wait(timeout):
+            raise RuntimeError('Model is not loaded yet')
+        return self._active
+
+    def activate(self, model_dir, allow_mock=False):
+        """Load the version in model_dir and atomically make it the active one.
+
+        Raises FileNotFoundError if model_dir has no bundle, unless allow_mock is set,
+        so a running app is never swapped from a real model to mock predictions.
+        """
+        with self._swap_lock:
+            loaded = load_version(model_dir)
+            if loaded.is_mock and not allow_mock:
+                raise FileNotFoundError(f'No model bundle found in {model_dir}')
+            previous, self._active = self._active, loaded
+            self.model_dir = model_dir
+            self.error = None
+            self._ready.set()
+
+        logger.info(f"Activated model version {loaded.version} from {model_dir}")
+        if previous is not None and previous.version != loaded.version:
+            for callback in self._listeners:
+                callback(previous, loaded)
+        return loaded
+
+    def status(self):
+        active = self._active
+        return {
+            'ready': self.is_ready,
+            'model_version': active.version if active else None,
+            'loaded_at': active.loaded_at.isoformat() if active else None,
+            'error': self.error
+        }
+
+# Shared by the Flask API and the Streamlit app
+registry = ModelRegistry()
@@ -0,0 +1,98 @@
+import numpy as np
+
+PERFORMANCE_LABELS = {0: "At Risk", 1: "Average", 2: "High Performance"}
+
+# Mapping from StudentProfile attributes to the model's feature columns
+PROFILE_FEATURES = [
+    ('gender', 'Gender'),
+    ('age', 'age'),
+    ('teacher_feedback', 'Teacher_Feedback'),
+    ('attendance', 'Attendance'),
+    ('hours_studied', 'Hours_Studied'),
+    ('parental_involvement', 'Parental_Involvement'),
+    ('access_to_resources', 'Access_to_Resources'),
+    ('extracurricular_activities', 'Extracurricular_Activities'),
+    ('sleep_hours', 'Sleep_Hours'),
+    ('physical_activity', 'Physical_Activity'),
+    ('internet_access', 'Internet_Access'),
+    ('tutoring_sessions', 'Tutoring_Sessions'),
+    ('family_income', 'Family_Income'),
+    ('school_type', 'School_Type'),
+    ('peer_influence', 'Peer_Influence'),
+    ('learning_disabilities', 'Learning_Disabilities'),
+    ('parental_education_level', 'Parental_Education_Level'),
+    ('distance_from_home', 'Distance_from_Home'),
+]
+
+# Profile attributes that are used by the fallback scoring formula but are not model features
+EXTRA_ATTRIBUTES = [('previous_scores', 'Previous_Scores')]
+
+def physical_activity_level(hours):
+    """Bucket weekly physical activity hours the same way the prediction form does"""
+    if hours is None:
+        return None
+    return 'Low' if hours <= 2 else 'Medium' if hours <= 4 else 'High'
+
+def profiles_to_columns(profiles):
+    """Convert StudentProfile rows into a column-oriented batch keyed by model column names"""
+    columns = {}
+    for attribute, column in PROFILE_FEATURES + EXTRA_ATTRIBUTES:
+        columns[column] = [getattr(profile, attribute) for profile in profiles]
+
+    columns['Physical_Activity.1'] = [physical_activity_level(hours) for hours in columns['Physical_Activity']]
+    return columns
+
+def numeric_column(values, default):
+    """Convert a list of optional numbers to a float array, filling missing values"""
+    array = np.array([default if value is None else value for value in values], dtype=np.float64)
+    array[np.isnan(array)] = default
+    return array
+
+def mock_scores(columns, rng=None):
+    """Vectorized version of the heuristic used while no trained model is loaded"""
+    rng = rng or np.random.default_rng()
+
+    base_score = numeric_column(columns['Previous_Scores'], 75)
+    attendance_factor = numeric_column(columns['Attendance'], 80) / 100.0
+    study_factor = np.minimum(numeric_column(columns['Hours_Studied'], 20) / 40.0, 1.0)
+
+    prediction = base_score * 0.6 + attendance_factor * 20 + study_factor * 15
+    noise = rng.uniform(-5, 5, size=len(prediction))
+    return np.clip(prediction + noise, 0, 100)
+
+def score_categories(scores, thresholds=(60, 80)):
+    """Bucket scores into performance categories the same way the training notebook does"""
+    return np.digitize(scores, thresholds)
+
+def encode_batch(columns, models=None):
+    """Encode a column-oriented batch into raw feature rows for hashing and scoring"""
+    if models is None:
+        # Without an encoder the fallback keys on the raw input values
+        return np.array([[np.nan if value is None else value for value in columns[column]]
+                         for column in ('Previous_Scores', 'Attendance', 'Hours_Studied')], dtype=np.float32).T
+    encoder = models[0]
+    return encoder.encode(columns)
+
+def score_encoded(raw, columns, models=None, rng=None):
+    """Score rows already encoded with encode_batch"""
+    if models is None:
+        predicted_scores = mock_scores(columns, rng)
+        confidence = np.full(len(predicted_scores), 0.85)
+        return predicted_scores, confidence, score_categories(predicted_scores)
+
+    encoder, classifier, regressor = models
+    classifier_input, regressor_input = encoder.scale(raw)
+
+    probabilities = classifier.predict_proba(classifier_input)
+    categories = classifier.classes[probabilities.argmax(axis=1)]
+    predicted_scores = np.clip(regressor.predict(regressor_input), 0, 100)
+    return predicted_scores, probabilities.max(axis=1), categories
+
+def score_batch(columns, models=None, rng=None):
+    """Score a whole column-oriented batch at once.
+
+    models is the (encoder, classifier, regressor) tuple of a loaded model bundle; when it
+    is None the heuristic fallback is used. Returns predicted scores, confidence levels and
+    performance categories as arrays aligned with the input rows.
+    """
+    return score_encoded(encode_batch(columns, models), columns, models, rng)
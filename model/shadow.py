@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+from model.scoring import PERFORMANCE_LABELS, score_batch
+
+# Recent absolute score deltas kept for percentile estimates
+DELTA_SAMPLES = 10000
+
+class ShadowScorer:
+    """Scores copies of live prediction inputs with a candidate model off the request path.
+
+    Request threads hand over the raw input columns and the live results with a
+    non-blocking put; a background thread scores them with the candidate and
+    records how often it agrees with the live model and how far its scores are.
+    When the bounded queue is full the copy is dropped and counted, so shadowing
+    never makes a request wait.
+    """
+
+    def __init__(self, max_queue=1000):
+        self.max_queue = max_queue
+        self.candidate = None
+        self.started_at = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._reset()
+
+    def _reset(self):
+        self.submitted = 0
+        self.scored = 0
+        self.dropped = 0
+        self.errors = 0
+        self.agreements = 0
+        self.delta_sum = 0.0
+        self.scoring_seconds = 0.0
+        self.live_versions = set()
+        self.confusion = np.zeros((len(PERFORMANCE_LABELS), len(PERFORMANCE_LABELS)), dtype=np.int64)
+        self._deltas = deque(maxlen=DELTA_SAMPLES)
+
+    def start(self, candidate):
+        """Shadow the live model with a LoadedModel, starting from fresh statistics"""
+        with self._lock:
+            self.candidate = candidate
+            self.started_at = datetime.utcnow()
+            self._reset()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop shadowing; queued copies for the old candidate are discarded"""
+        with self._lock:
+            self.candidate = None
+
+    def submit(self, columns, scores, categories, live_version):
+        """Queue a copy of one prediction batch; returns False if it was dropped"""
+        candidate = self.candidate
+        if candidate is None:
+            return False
+
+        rows = len(scores)
+        try:
+            self._queue.put_nowait((candidate, columns, np.asarray(scores), np.asarray(categories), live_version))
+        except queue.Full:
+            with self._lock:
+                self.dropped += rows
+            return False
+
+        with self._lock:
+            self.submitted += rows
+        return True
+
+    def _run(self):
+        while True:
+            candidate, columns, live_scores, live_categories, live_version = self._queue.get()
+            # Copies queued for a candidate that has since been replaced are not scored
+            if candidate is not self.candidate:
+                continue
+
+            started = time.perf_counter()
+            try:
+                scores, _, categories = score_batch(columns, candidate.models)
+            except Exception:
+                with self._lock:
+                    self.errors += len(live_scores)
+                continue
+            elapsed = time.perf_counter() - started
+
+            deltas = scores - live_scores
+            with self._lock:
+                if candidate is not self.candidate:
+                    continue
+                self.scored += len(deltas)
+                self.agreements += int(np.sum(categories == live_categories))
+                self.delta_sum += float(deltas.sum())
+                self.scoring_seconds += elapsed
+                self.live_versions.add(live_version)
+                np.add.at(self.confusion, (live_categories.astype(np.intp), categories.astype(np.intp)), 1)
+                self._deltas.extend(np.abs(deltas).tolist())
+
+    def stats(self):
+        with self._lock:
+            if self.candidate is None:
+                return {'active': False}
+
+            deltas = np.array(self._deltas)
+            percentiles = np.percentile(deltas, [50, 95, 99]).round(4).tolist() if len(deltas) else [None] * 3
+            labels = [PERFORMANCE_LABELS[category] for category in sorted(PERFORMANCE_LABELS)]
+            return {
+                'active': True,
+                'candidate_version': self.candidate.version,
+                'live_versions': sorted(self.live_versions),
+                'started_at': self.started_at.isoformat(),
+                'submitted': self.submitted,
+                'scored': self.scored,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'queue_depth': self._queue.qsize(),
+                'queue_size': self.max_queue,
+                'agreement_rate': round(self.agreements / self.scored, 4) if self.scored else None,
+                'mean_score_delta': round(self.delta_sum / self.scored, 4) if self.scored else None,
+                'abs_score_delta': dict(zip(('p50', 'p95', 'p99'), percentiles)),
+                'rows_per_sec': round(self.scored / self.scoring_seconds) if self.scoring_seconds else None,
+                # Rows are the live model's category, columns the candidate's
+                'confusion': {
+                    live: dict(zip(labels, self.confusion[i].tolist())) for i, live in enumerate(labels)
+                }
+            }
@@ -0,0 +1,111 @@
+import itertools
+import math
+import numpy as np
+from model.scoring import PERFORMANCE_LABELS, PROFILE_FEATURES, physical_activity_level, score_batch
+
+# Most variants a single sweep may evaluate
+MAX_SWEEP_POINTS = 10000
+MAX_SWEEP_FEATURES = 2
+
+# Sweepable features, addressed by profile attribute name as elsewhere in the API
+SWEEP_FEATURES = dict(PROFILE_FEATURES)
+
+# Physically possible range of each numeric feature
+NUMERIC_SWEEP_RANGES = {
+    'age': (0, 120),
+    'attendance': (0, 100),
+    'hours_studied': (0, 168),
+    'sleep_hours': (0, 24),
+    'physical_activity': (0, 168),
+    'tutoring_sessions': (0, 100),
+}
+NUMERIC_SWEEP_FEATURES = set(NUMERIC_SWEEP_RANGES)
+
+# Numeric values further than this many training standard deviations from the
+# training mean are outside anything the model has seen
+MAX_SWEEP_STDS = 10
+
+def is_scalar(value):
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+def numeric_range(feature, encoder=None):
+    """Accepted (low, high) for a numeric feature, narrowed to the model's training scale when loaded"""
+    low, high = NUMERIC_SWEEP_RANGES[feature]
+    column = SWEEP_FEATURES[feature]
+    if encoder is not None and column in encoder.feature_names:
+        index = encoder.feature_names.index(column)
+        mean, scale = encoder.means[0][index], encoder.scales[0][index]
+        low, high = max(low, mean - MAX_SWEEP_STDS * scale), min(high, mean + MAX_SWEEP_STDS * scale)
+    return low, high
+
+def validate_sweep(grids, encoder=None):
+    """Return an error message for an invalid sweep specification, or None.
+
+    grids is a list of (feature, values) pairs; categorical values are checked
+    against the encoder's known categories when one is loaded.
+    """
+    if not 1 <= len(grids) <= MAX_SWEEP_FEATURES:
+        return f'Sweep between 1 and {MAX_SWEEP_FEATURES} features'
+
+    points = 1
+    for feature, values in grids:
+        if not isinstance(feature, str) or feature not in SWEEP_FEATURES:
+            return f'Unsupported sweep feature: {feature}'
+        if not isinstance(values, list) or not values:
+            return f'Values for {feature} must be a non-empty list'
+        if not all(is_scalar(value) for value in values):
+            return f'Values for {feature} must be numbers or strings, not lists, objects, booleans or null'
+        if feature in NUMERIC_SWEEP_FEATURES:
+            if not all(isinstance(value, (int, float)) and math.isfinite(value) for value in values):
+                return f'Values for {feature} must be finite numbers'
+            low, high = numeric_range(feature, encoder)
+            outside = [value for value in values if not low <= value <= high]
+            if outside:
+                return f'Values for {feature} must be between {low:g} and {high:g}: {outside}'
+        elif encoder is not None:
+            known = encoder.lookup.get(SWEEP_FEATURES[feature], {})
+            unknown = [value for value in values if value not in known]
+            if unknown:
+                return f'Unknown values for {feature}: {unknown}'
+        points *= len(values)
+
+    if len({feature for feature, _ in grids}) != len(grids):
+        return 'Each feature can only be swept once'
+    if points > MAX_SWEEP_POINTS:
+        return f'Sweep has {points} points; the limit is {MAX_SWEEP_POINTS}'
+    return None
+
+def sweep_columns(base, grids):
+    """Expand one row of model columns into every combination of the grid values.
+
+    base maps model column names to a single value. Rows are ordered with the
+    last feature varying fastest, matching np.reshape of the response surface.
+    """
+    combinations = list(itertools.product(*(values for _, values in grids)))
+    columns = {column: [value] * len(combinations) for column, value in base.items()}
+
+    for index, (feature, _) in enumerate(grids):
+        column = SWEEP_FEATURES[feature]
+        columns[column] = [combination[index] for combination in combinations]
+        if column == 'Physical_Activity':
+            columns['Physical_Activity.1'] = [physical_activity_level(hours) for hours in columns[column]]
+    return columns
+
+def run_sweep(base, grids, models=None):
+    """Score every grid combination around a base row in one model call.
+
+    Returns the response surface as nested lists shaped like the grids: a list for
+    a one-feature sweep, a list of rows (first feature) by columns (second feature)
+    for a two-feature sweep.
+    """
+    shape = [len(values) for _, values in grids]
+    predicted_scores, confidence, categories = score_batch(sweep_columns(base, grids), models)
+
+    return {
+        'features': [feature for feature, _ in grids],
+        'grid': {feature: values for feature, values in grids},
+        'points': int(np.prod(shape)),
+        'predicted_score': np.round(predicted_scores, 2).reshape(shape).tolist(),
+        'confidence_level': np.round(confidence, 4).reshape(shape).tolist(),
+        'performance_category': np.vectorize(PERFORMANCE_LABELS.get, otypes=[object])(categories).reshape(shape).tolist()
+    }
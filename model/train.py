@@ -0,0 +1,349 @@
+"""Retrain the classifier and regressor from the cleaned dataset.
+
+Reproduces model_data/model_training.ipynb as one command:
+
+    python -m model.train [--data model_data/cleaned_dataset.csv] [--output model_data]
+                          [--search grid|halving] [--compare] [--quick]
+
+The preprocessed matrix is cached on disk keyed by the dataset contents, the grid
+search and cross-validation run on all cores, and the run writes the sklearn
+artifacts, a model bundle and a timing and accuracy report to the output directory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from model.bundle import BUNDLE_FILE, write_bundle
+from model.drift import baseline_histograms
+from model.encoder import FeatureEncoder
+from model.forest import MODEL_DIR, Forest
+
+TARGET_COLUMN = 'Previous_Scores'
+DROP_COLUMNS = ['student_id']
+PERFORMANCE_THRESHOLDS = [60, 80]
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+CV_FOLDS = 5
+
+# Parameters of the regressor and of the notebook's baseline classifier
+BASE_PARAMS = {'n_estimators': 100, 'max_depth': 10, 'min_samples_split': 5}
+
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [5, 10, 15],
+    'min_samples_split': [2, 5, 10]
+}
+
+# Successive halving keeps the best 1/HALVING_FACTOR of candidates per rung and
+# multiplies the rows and trees each survivor gets by HALVING_FACTOR
+HALVING_FACTOR = 3
+MIN_HALVING_TREES = 10
+
+SEARCH_MODES = ('grid', 'halving')
+
+# Bump when preprocessing changes so stale cached matrices are not reused
+PREPROCESS_VERSION = 2
+
+REPORT_FILE = 'training_report.json'
+
+class Timer:
+    """Collects wall-clock timings of named training stages"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        print(f"  {name}: {self.timings[name]:.2f}s")
+
+def dataset_fingerprint(path):
+    digest = hashlib.sha1(str(PREPROCESS_VERSION).encode('utf-8'))
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def preprocess(df):
+    """Label-encode categorical columns the way the training notebook does"""
+    from sklearn.preprocessing import LabelEncoder
+
+    X = df.drop([TARGET_COLUMN] + DROP_COLUMNS, axis=1)
+    label_encoders = {}
+    for column in X.select_dtypes(include=['object']).columns:
+        encoder = LabelEncoder()
+        X[column] = encoder.fit_transform(X[column].astype(str))
+        label_encoders[column] = encoder
+
+    y_regression = df[TARGET_COLUMN].to_numpy()
+    y_classification = np.digitize(y_regression, PERFORMANCE_THRESHOLDS)
+    return X, y_regression, y_classification, label_encoders
+
+def load_training_data(data_path, cache_dir):
+    """Preprocessed features, targets, label encoders and drift baseline, and whether the cache was used"""
+    from sklearn.preprocessing import LabelEncoder
+
+    cache_path = os.path.join(cache_dir, f"train_{dataset_fingerprint(data_path)}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            X = pd.DataFrame(data['X'], columns=meta['columns'])
+            for column in meta['integer_columns']:
+                X[column] = X[column].astype(np.int64)
+            label_encoders = {}
+            for column, classes in meta['categories'].items():
+                encoder = LabelEncoder()
+                encoder.classes_ = np.array(classes, dtype=object)
+                label_encoders[column] = encoder
+            return X, data['y_regression'], data['y_classification'], label_encoders, meta['drift_baseline'], True
+
+    df = pd.read_csv(data_path)
+    drift_baseline = baseline_histograms(df)
+    X, y_regression, y_classification, label_encoders = preprocess(df)
+    meta = {
+        'drift_baseline': drift_baseline,
+        'columns': list(X.columns),
+        'integer_columns': [column for column in X.columns if pd.api.types.is_integer_dtype(X[column])],
+        'categories': {column: [str(c) for c in encoder.classes_] for column, encoder in label_encoders.items()}
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(cache_path, X=X.to_numpy(dtype=np.float64), y_regression=y_regression,
+             y_classification=y_classification, meta=np.array(json.dumps(meta)))
+    return X, y_regression, y_classification, label_encoders, drift_baseline, False
+
+def scaled_split(X, y, stratify=False):
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y if stratify else None
+    )
+    scaler = StandardScaler()
+    # Scalers are fitted on DataFrames so they remember the feature names for serving
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    return scaler, X_train_scaled, X_test_scaled, y_train, y_test
+
+def grid_search(X, y, n_jobs=-1):
+    """Exhaustive search as in the notebook; returns (best estimator, best params, candidates evaluated)"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import GridSearchCV
+
+    # Parallelism is across the grid's fits; each forest is built on one core
+    search = GridSearchCV(
+        RandomForestClassifier(random_state=RANDOM_STATE),
+        PARAM_GRID,
+        cv=CV_FOLDS,
+        scoring='accuracy',
+        n_jobs=n_jobs
+    )
+    search.fit(X, y)
+    return search.best_estimator_, search.best_params_, {'candidates': len(search.cv_results_['params'])}
+
+def _fold_score(params, X, y, train_index, test_index):
+    from sklearn.ensemble import RandomForestClassifier
+
+    classifier = RandomForestClassifier(random_state=RANDOM_STATE, **params)
+    classifier.fit(X[train_index], y[train_index])
+    return classifier.score(X[test_index], y[test_index])
+
+def halving_search(X, y, n_jobs=-1, factor=HALVING_FACTOR):
+    """Successive halving over the notebook grid; returns (best estimator, best params, search summary).
+
+    Early rungs score every candidate on a stratified subsample with a fraction of
+    its trees; only the best 1/factor advance, each time with factor times more rows
+    and trees, so full-size forests on all rows are cross-validated for the last
+    few candidates only.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import ParameterGrid, StratifiedKFold
+    from sklearn.utils import resample
+
+    X = np.asarray(X)
+    y = np.asarray(y)
+    candidates = list(ParameterGrid(PARAM_GRID))
+    rungs = max(1, int(np.ceil(np.log(len(candidates)) / np.log(factor))))
+
+    history = []
+    for rung in range(rungs):
+        shrink = factor ** (rungs - 1 - rung)
+        n_samples = max(len(X) // shrink, CV_FOLDS * factor * 10)
+        if n_samples < len(X):
+            X_rung, y_rung = resample(X, y, n_samples=n_samples, replace=False, stratify=y, random_state=RANDOM_STATE + rung)
+        else:
+            X_rung, y_rung = X, y
+
+        budgets = [
+            dict(params, n_estimators=max(MIN_HALVING_TREES, params['n_estimators'] // shrink))
+            for params in candidates
+        ]
+        folds = list(StratifiedKFold(n_splits=CV_FOLDS).split(X_rung, y_rung))
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(_fold_score)(params, X_rung, y_rung, train_index, test_index)
+            for params in budgets for train_index, test_index in folds
+        )
+        mean_scores = np.asarray(scores).reshape(len(candidates), CV_FOLDS).mean(axis=1)
+        order = np.argsort(-mean_scores, kind='stable')
+
+        history.append({
+            'candidates': len(candidates),
+            'samples': len(X_rung),
+            'tree_fraction': round(1 / shrink, 4),
+            'best_score': round(float(mean_scores[order[0]]), 4)
+        })
+        if rung < rungs - 1:
+            candidates = [candidates[i] for i in order[:max(1, -(-len(candidates) // factor))]]
+        else:
+            candidates = [candidates[order[0]]]
+
+    best_params = candidates[0]
+    best = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=n_jobs, **best_params)
+    best.fit(X, y)
+    return best, best_params, {'candidates': sum(entry['candidates'] for entry in history), 'rungs': history}
+
+SEARCHES = {'grid': grid_search, 'halving': halving_search}
+
+def train(data_path, output_dir, quick=False, n_jobs=-1, search='grid', compare=False):
+    """Train both models and write artifacts, bundle and report to output_dir.
+
+    compare also runs the search mode not selected, reporting the wall time and
+    accuracy of both; the selected mode's model is the one written.
+    """
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
+    from sklearn.model_selection import cross_val_score
+
+    timer = Timer()
+    report = {
+        'data': data_path,
+        'search': None if quick else search,
+        'n_jobs': n_jobs or 1,
+        'cpu_count': os.cpu_count()
+    }
+
+    print("📦 Preparing data")
+    with timer.stage('preprocess'):
+        X, y_regression, y_classification, label_encoders, drift_baseline, cached = load_training_data(
+            data_path, os.path.join(output_dir, '.cache')
+        )
+    report['preprocess_cache_hit'] = cached
+    report['rows'] = len(X)
+
+    print("🎯 Classifier")
+    scaler_clf, X_train_clf, X_test_clf, y_train_clf, y_test_clf = scaled_split(X, y_classification, stratify=True)
+    if quick:
+        best_params = dict(BASE_PARAMS)
+        with timer.stage('classifier_fit'):
+            classifier = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=n_jobs, **best_params)
+            classifier.fit(X_train_clf, y_train_clf)
+    else:
+        modes = [search] + [mode for mode in SEARCH_MODES if mode != search] if compare else [search]
+        results = {}
+        for mode in modes:
+            with timer.stage(f'{mode}_search'):
+                estimator, params, summary = SEARCHES[mode](X_train_clf, y_train_clf, n_jobs=n_jobs)
+            results[mode] = dict(
+                summary,
+                params=params,
+                seconds=timer.timings[f'{mode}_search'],
+                accuracy=round(float(accuracy_score(y_test_clf, estimator.predict(X_test_clf))), 4)
+            )
+            if mode == search:
+                classifier, best_params = estimator, params
+        report['searches'] = results
+
+        if compare:
+            report['search_comparison'] = {
+                'seconds_saved': round(results['grid']['seconds'] - results['halving']['seconds'], 3),
+                'speedup': round(results['grid']['seconds'] / max(results['halving']['seconds'], 1e-9), 2),
+                'accuracy_difference': round(results['halving']['accuracy'] - results['grid']['accuracy'], 4)
+            }
+            # Comparison runs are reported, not counted as training time
+            del timer.timings[f"{modes[1]}_search"]
+    report['classifier_params'] = best_params
+    report['classifier_accuracy'] = round(float(accuracy_score(y_test_clf, classifier.predict(X_test_clf))), 4)
+
+    with timer.stage('classifier_cv'):
+        cv_scores_clf = cross_val_score(classifier, X_train_clf, y_train_clf, cv=CV_FOLDS, n_jobs=n_jobs)
+    report['classifier_cv_mean'] = round(float(cv_scores_clf.mean()), 4)
+    report['classifier_cv_std'] = round(float(cv_scores_clf.std()), 4)
+
+    print("📈 Regressor")
+    scaler_reg, X_train_reg, X_test_reg, y_train_reg, y_test_reg = scaled_split(X, y_regression)
+    with timer.stage('regressor_fit'):
+        regressor = RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=n_jobs, **BASE_PARAMS)
+        regressor.fit(X_train_reg, y_train_reg)
+    predictions = regressor.predict(X_test_reg)
+    report['regressor_r2'] = round(float(r2_score(y_test_reg, predictions)), 4)
+    report['regressor_rmse'] = round(float(np.sqrt(mean_squared_error(y_test_reg, predictions))), 4)
+
+    with timer.stage('regressor_cv'):
+        cv_scores_reg = cross_val_score(regressor, X_train_reg, y_train_reg, cv=CV_FOLDS, scoring='r2', n_jobs=n_jobs)
+    report['regressor_cv_mean'] = round(float(cv_scores_reg.mean()), 4)
+    report['regressor_cv_std'] = round(float(cv_scores_reg.std()), 4)
+
+    print("💾 Writing artifacts")
+    feature_importance = pd.DataFrame({
+        'feature': X.columns,
+        'importance': classifier.feature_importances_
+    }).sort_values('importance', ascending=False)
+
+    with timer.stage('write'):
+        os.makedirs(output_dir, exist_ok=True)
+        joblib.dump(regressor, os.path.join(output_dir, 'rf_grade_predictor.pkl'))
+        joblib.dump(classifier, os.path.join(output_dir, 'rf_performance_classifier.pkl'))
+        joblib.dump(scaler_clf, os.path.join(output_dir, 'scaler_classifier.pkl'))
+        joblib.dump(scaler_reg, os.path.join(output_dir, 'scaler_regressor.pkl'))
+        joblib.dump(label_encoders, os.path.join(output_dir, 'label_encoders.pkl'))
+        joblib.dump(feature_importance, os.path.join(output_dir, 'feature_importance.pkl'))
+
+        encoder = FeatureEncoder.from_artifacts(label_encoders, scaler_clf, scaler_reg)
+        manifest = write_bundle(
+            os.path.join(output_dir, BUNDLE_FILE),
+            encoder,
+            Forest.from_sklearn(classifier),
+            Forest.from_sklearn(regressor),
+            [{'feature': str(row['feature']), 'importance': float(row['importance'])}
+             for row in feature_importance.to_dict('records')],
+            drift_baseline
+        )
+    report['model_version'] = manifest['model_version']
+    report['timings'] = timer.timings
+    report['total_seconds'] = round(sum(timer.timings.values()), 3)
+
+    with open(os.path.join(output_dir, REPORT_FILE), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the performance classifier and grade predictor")
+    parser.add_argument('--data', default=os.path.join(MODEL_DIR, 'cleaned_dataset.csv'))
+    parser.add_argument('--output', default=MODEL_DIR)
+    parser.add_argument('--quick', action='store_true', help="Skip the grid search and use the notebook's parameters")
+    parser.add_argument('--search', choices=SEARCH_MODES, default='grid',
+                        help="Hyperparameter search: exhaustive grid or successive halving")
+    parser.add_argument('--compare', action='store_true',
+                        help="Also run the other search mode and report time saved and accuracy difference")
+    parser.add_argument('--jobs', type=int, default=-1, help="Parallel workers; -1 uses all cores")
+    args = parser.parse_args()
+
+    report = train(args.data, args.output, quick=args.quick, n_jobs=args.jobs, search=args.search, compare=args.compare)
+    print(f"\n✅ Model {report['model_version']} trained in {report['total_seconds']:.1f}s")
+    print(f"   Classification accuracy: {report['classifier_accuracy']:.4f} "
+          f"(CV {report['classifier_cv_mean']:.4f} ± {report['classifier_cv_std'] * 2:.4f})")
+    if 'search_comparison' in report:
+        comparison = report['search_comparison']
+        print(f"   Halving vs grid search: {comparison['seconds_saved']:.1f}s saved ({comparison['speedup']:.1f}x), "
+              f"accuracy difference {comparison['accuracy_difference']:+.4f}")
+    print(f"   Regression R²: {report['regressor_r2']:.4f}, RMSE: {report['regressor_rmse']:.4f}")
+    print(f"   Report written to {os.path.join(args.output, REPORT_FILE)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Warm-start update of the active model from newly recorded exam scores.
+
+    python -m model.update [--db student_performance.db] [--profiles-db DATABASE_URL] [--since YYYY-MM-DD]
+                           [--data new_rows.csv] [--trees N] [--output model_data/model.bundle] [--dry-run]
+
+Exam scores come from the Streamlit app's performance_records and the model
+features of each student from the API's student_profiles table. Trains a few
+trees on the newest performance records, appends them to both
+forests of the current bundle and retires the same number of the oldest trees.
+The updated model is only published if it does no worse than the current one
+on a holdout of the new data and on the original test split.
+"""
+import argparse
+import json
+import os
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from model.bundle import BUNDLE_FILE, load_bundle, write_bundle
+from model.forest import MODEL_DIR, Forest
+from model.scoring import PROFILE_FEATURES, profiles_to_columns, score_categories
+from model.train import BASE_PARAMS, PERFORMANCE_THRESHOLDS, RANDOM_STATE, TARGET_COLUMN, TEST_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Database of the API, whose student_profiles hold the model features
+PROFILES_DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///student_performance.db')
+
+# Share of each forest replaced per update unless --trees is given
+UPDATE_TREE_FRACTION = 0.1
+
+# Records from this many days back are used unless --since is given
+UPDATE_WINDOW_DAYS = 30
+
+# Fewer new students than this is not enough to train and validate on
+MIN_UPDATE_ROWS = 50
+
+# Publishing gates: the updated model may not lose more than this on either holdout
+MAX_ACCURACY_DROP = 0.01
+MAX_RMSE_INCREASE = 0.02
+
+def load_recent_scores(db_path, since):
+    """Per-student mean exam percentage since a date, from the Streamlit app's performance_records"""
+    query = '''
+        SELECT student_id, AVG(score * 100.0 / max_score) AS score
+        FROM performance_records
+        WHERE date_taken >= ? AND max_score > 0
+        GROUP BY student_id
+    '''
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query(query, conn, params=(since,))
+    finally:
+        conn.close()
+
+def load_profile_features(database_url, student_ids):
+    """Model features of the given students from the API's student_profiles table"""
+    from sqlalchemy import bindparam, create_engine, inspect, text
+
+    engine = create_engine(database_url)
+    try:
+        # The Streamlit schema has a student_profiles table too, without the feature columns
+        present = {column['name'] for column in inspect(engine).get_columns('student_profiles')}
+        missing = [attribute for attribute, _ in PROFILE_FEATURES if attribute not in present]
+        if missing:
+            raise ValueError(f"student_profiles in {database_url} has no model feature columns "
+                             f"({', '.join(missing[:3])}, ...); point --profiles-db at the API database")
+
+        attributes = ', '.join(attribute for attribute, _ in PROFILE_FEATURES)
+        query = text(f'SELECT student_id, {attributes} FROM student_profiles WHERE student_id IN :ids')
+        with engine.connect() as conn:
+            return pd.read_sql_query(query.bindparams(bindparam('ids', expanding=True)), conn,
+                                     params={'ids': list(student_ids)})
+    finally:
+        engine.dispose()
+
+def load_recent_records(db_path, since, database_url=PROFILES_DATABASE_URL):
+    """Per-student mean exam percentage since a date, joined with the model features"""
+    scores = load_recent_scores(db_path, since)
+    if scores.empty:
+        return profiles_to_columns([]), np.empty(0, dtype=np.float64)
+
+    profiles = load_profile_features(database_url, scores['student_id'])
+    df = profiles.merge(scores, on='student_id')
+    if len(df) < len(scores):
+        logger.warning(f"{len(scores) - len(df)} students with new scores have no API profile and are skipped")
+
+    columns = profiles_to_columns(list(df.drop(columns='score').assign(previous_scores=None).itertuples(index=False)))
+    return columns, df['score'].to_numpy(dtype=np.float64)
+
+def load_labeled_csv(path):
+    """Rows in the cleaned dataset's format, with Previous_Scores as the target"""
+    df = pd.read_csv(path)
+    columns = {column: df[column].tolist() for column in df.columns}
+    return columns, df[TARGET_COLUMN].to_numpy(dtype=np.float64)
+
+def original_test_split(encoder, data_path):
+    """The test rows held out by the training notebook, as (classifier rows, regressor rows).
+
+    The notebook split the data separately for each model, stratified for the
+    classifier, so each model is checked on rows it never saw.
+    """
+    from sklearn.model_selection import train_test_split
+
+    columns, scores = load_labeled_csv(data_path)
+    raw = encoder.encode(columns)
+    categories = score_categories(scores, PERFORMANCE_THRESHOLDS)
+    splits = []
+    for stratify in (categories, None):
+        _, raw_test, _, scores_test = train_test_split(
+            raw, scores, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=stratify
+        )
+        splits.append((raw_test, scores_test))
+    return tuple(splits)
+
+def evaluate(models, classifier_data, regressor_data=None):
+    """Classifier accuracy and regressor RMSE on (raw, scores) holdouts"""
+    encoder, classifier, regressor = models
+    raw, scores = classifier_data
+    accuracy = float(np.mean(classifier.predict(encoder.scale(raw)[0]) == score_categories(scores, PERFORMANCE_THRESHOLDS)))
+    raw, scores = regressor_data or classifier_data
+    rmse = float(np.sqrt(np.mean((regressor.predict(encoder.scale(raw)[1]) - scores) ** 2)))
+    return {'accuracy': round(accuracy, 4), 'rmse': round(rmse, 4)}
+
+def fit_trees(X, y, n_trees, classifier, n_jobs=-1):
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+    estimator_class = RandomForestClassifier if classifier else RandomForestRegressor
+    estimator = estimator_class(random_state=RANDOM_STATE, n_jobs=n_jobs, **dict(BASE_PARAMS, n_estimators=n_trees))
+    estimator.fit(X, y)
+    return Forest.from_sklearn(estimator)
+
+def update_models(models, raw, scores, n_trees, n_jobs=-1):
+    """Both forests with n_trees new trees fitted on (raw, scores) replacing their n_trees oldest"""
+    encoder, classifier, regressor = models
+    # New trees see inputs scaled exactly like the existing ones, so the encoder is unchanged
+    classifier_input, regressor_input = encoder.scale(raw)
+    categories = score_categories(scores, PERFORMANCE_THRESHOLDS)
+
+    new_classifier = fit_trees(classifier_input, categories, n_trees, classifier=True, n_jobs=n_jobs)
+    new_regressor = fit_trees(regressor_input, scores, n_trees, classifier=False, n_jobs=n_jobs)
+    return encoder, classifier.replace_trees(new_classifier, n_trees), regressor.replace_trees(new_regressor, n_trees)
+
+def passes(before, after):
+    return (after['accuracy'] >= before['accuracy'] - MAX_ACCURACY_DROP and
+            after['rmse'] <= before['rmse'] * (1 + MAX_RMSE_INCREASE))
+
+def run_update(bundle_path, columns, scores, output_path, n_trees=None, reference_data=None, dry_run=False, n_jobs=-1):
+    """Warm-start the bundle with new labeled rows; returns a report of the update"""
+    from sklearn.model_selection import train_test_split
+
+    started = time.perf_counter()
+    bundle = load_bundle(bundle_path)
+    encoder = bundle.encoder
+    report = {'base_version': bundle.version, 'rows': len(scores), 'published': False}
+    if len(scores) < MIN_UPDATE_ROWS:
+        report['reason'] = f"Only {len(scores)} new rows, at least {MIN_UPDATE_ROWS} are needed"
+        return report
+
+    n_trees = n_trees or max(1, int(bundle.classifier.n_trees * UPDATE_TREE_FRACTION))
+    report['trees_replaced'] = n_trees
+
+    raw = encoder.encode(columns)
+    raw_train, raw_holdout, scores_train, scores_holdout = train_test_split(
+        raw, scores, test_size=TEST_SIZE, random_state=RANDOM_STATE
+    )
+
+    fit_started = time.perf_counter()
+    updated = update_models(bundle.models, raw_train, scores_train, n_trees, n_jobs=n_jobs)
+    report['fit_seconds'] = round(time.perf_counter() - fit_started, 3)
+
+    holdouts = {'new_data': ((raw_holdout, scores_holdout),)}
+    if reference_data and os.path.exists(reference_data):
+        holdouts['original_test'] = original_test_split(encoder, reference_data)
+
+    report['validation'] = {}
+    published = True
+    for name, holdout in holdouts.items():
+        before = evaluate(bundle.models, *holdout)
+        after = evaluate(updated, *holdout)
+        report['validation'][name] = {'current': before, 'updated': after, 'passed': passes(before, after)}
+        published = published and report['validation'][name]['passed']
+
+    if not published:
+        report['reason'] = 'Updated model did worse than the current one on a holdout'
+    elif not dry_run:
+        manifest = write_bundle(output_path, *updated, bundle.feature_importance, bundle.drift_baseline)
+        report['published'] = True
+        report['model_version'] = manifest['model_version']
+        report['output'] = output_path
+
+    report['total_seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start the model with newly recorded performance data")
+    parser.add_argument('--bundle', default=os.path.join(MODEL_DIR, BUNDLE_FILE))
+    parser.add_argument('--db', default='student_performance.db', help="Streamlit database with performance_records")
+    parser.add_argument('--profiles-db', default=PROFILES_DATABASE_URL,
+                        help="SQLAlchemy URL of the API database with the students' model features")
+    parser.add_argument('--since', help=f"Use records taken on or after this date (default: last {UPDATE_WINDOW_DAYS} days)")
+    parser.add_argument('--data', help="Read new rows from a CSV in the cleaned dataset's format instead of the database")
+    parser.add_argument('--reference', default=os.path.join(MODEL_DIR, 'cleaned_dataset.csv'),
+                        help="Dataset whose original test split must not get worse")
+    parser.add_argument('--trees', type=int, help="Trees to add and retire per forest")
+    parser.add_argument('--output', help="Where to publish the updated bundle (default: replace --bundle)")
+    parser.add_argument('--dry-run', action='store_true', help="Validate without publishing")
+    parser.add_argument('--jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    if args.data:
+        columns, scores = load_labeled_csv(args.data)
+    else:
+        since = args.since or (datetime.now() - timedelta(days=UPDATE_WINDOW_DAYS)).date().isoformat()
+        try:
+            columns, scores = load_recent_records(args.db, since, args.profiles_db)
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+
+    report = run_update(args.bundle, columns, scores, args.output or args.bundle, n_trees=args.trees,
+                        reference_data=args.reference, dry_run=args.dry_run, n_jobs=args.jobs)
+    print(json.dumps(report, indent=2))
+    if report['published']:
+        print(f"✅ Published model {report['model_version']} to {report['output']}")
+    else:
+        print(f"⚠️ Not published: {report.get('reason', 'dry run')}")
+
+if __name__ == "__main__":
+    main()
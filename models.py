@@ -1,9 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import uuid
+from data.storage import register_sqlalchemy_profile
 
 db = SQLAlchemy()
 
+# WAL, busy timeout and cache settings shared with the Streamlit app's connections
+register_sqlalchemy_profile()
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -48,6 +52,11 @@ class StudentProfile(db.Model):
     distance_from_home = db.Column(db.String(10))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Drift monitoring compares MAX(updated_at) with the histogram state
+        db.Index('idx_student_profiles_updated_at', 'updated_at'),
+    )
 
 class UserSession(db.Model):
     __tablename__ = 'user_sessions'
@@ -60,3 +69,76 @@ class UserSession(db.Model):
     user_agent = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Prediction(db.Model):
+    __tablename__ = 'predictions'
+    
+    prediction_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    student_id = db.Column(db.String(20), db.ForeignKey('student_profiles.student_id', ondelete='CASCADE'), nullable=False)
+    predicted_score = db.Column(db.Float)
+    confidence_level = db.Column(db.Float)
+    performance_category = db.Column(db.Integer)
+    prediction_date = db.Column(db.Date, nullable=False, default=lambda: datetime.utcnow().date())
+    model_version = db.Column(db.String(50))
+    feature_hash = db.Column(db.String(40))
+    job_id = db.Column(db.String(36), db.ForeignKey('prediction_jobs.job_id', ondelete='SET NULL'))
+    explanation = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_predictions_cache_key', 'student_id', 'feature_hash', 'model_version'),
+        db.Index('idx_predictions_job', 'job_id', 'student_id'),
+        db.Index('idx_predictions_freshness', 'student_id', 'model_version', 'created_at'),
+    )
+
+class PredictionJob(db.Model):
+    __tablename__ = 'prediction_jobs'
+    
+    job_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    mode = db.Column(db.String(20), nullable=False, default='full')
+    filters = db.Column(db.JSON)
+    model_version = db.Column(db.String(50))
+    total_students = db.Column(db.Integer, default=0)
+    processed_students = db.Column(db.Integer, default=0)
+    skipped_students = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.String(36), db.ForeignKey('users.user_id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class Counterfactual(db.Model):
+    __tablename__ = 'counterfactuals'
+    
+    counterfactual_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_id = db.Column(db.String(36), db.ForeignKey('prediction_jobs.job_id', ondelete='CASCADE'))
+    student_id = db.Column(db.String(20), db.ForeignKey('student_profiles.student_id', ondelete='CASCADE'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    changes = db.Column(db.JSON, nullable=False)
+    cost = db.Column(db.Float)
+    predicted_score = db.Column(db.Float)
+    confidence_level = db.Column(db.Float)
+    performance_category = db.Column(db.Integer)
+    model_version = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_counterfactuals_job', 'job_id', 'student_id', 'rank'),
+    )
+
+class FeatureHistogram(db.Model):
+    __tablename__ = 'feature_histograms'
+    
+    feature = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class FeatureHistogramState(db.Model):
+    __tablename__ = 'feature_histogram_state'
+    
+    # Single row describing the student_profiles the histograms were last synced with
+    id = db.Column(db.Integer, primary_key=True)
+    profile_count = db.Column(db.Integer, nullable=False, default=0)
+    last_profile_update = db.Column(db.DateTime)
+    rebuilt_at = db.Column(db.DateTime)
@@ -4,7 +4,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 from datetime import datetime, timedelta
-from data.database import db
+from data.database import db, AT_RISK_SCORE, RECENT_RECORDS
 
 def show_student_dashboard(student_id):
     """Show student dashboard with performance analytics"""
@@ -119,56 +119,34 @@ def show_teacher_dashboard():
     """Show teacher dashboard with class analytics"""
     st.markdown("## 👨‍🏫 Teacher Dashboard")
     
-    # Get all students
-    students = db.get_all_students()
+    # Class-wide metrics come from a few set-based queries, not one per student
+    summary = db.get_class_summary()
     
-    if students.empty:
+    if summary['total_students'] == 0:
         st.info("No students found in the system.")
         return
     
     # Overview metrics
     col1, col2, col3, col4 = st.columns(4)
+    recent = f"each student's {RECENT_RECORDS} most recent scores"
     
     with col1:
-        total_students = len(students)
-        st.metric("Total Students", total_students)
+        st.metric("Total Students", summary['total_students'])
     
     with col2:
-        # Calculate average performance across all students
-        all_performance = []
-        for _, student in students.iterrows():
-            student_perf = db.get_student_performance(student['student_id'])
-            if not student_perf.empty:
-                all_performance.append(student_perf['score'].mean())
-        
-        if all_performance:
-            class_avg = sum(all_performance) / len(all_performance)
-            st.metric("Class Average", f"{class_avg:.1f}%")
+        if summary['class_average'] is not None:
+            st.metric("Class Average", f"{summary['class_average']:.1f}%", help=f"Mean of the averages of {recent}")
         else:
             st.metric("Class Average", "N/A")
     
     with col3:
-        # Count students at risk (assuming recent performance < 70)
-        at_risk_count = 0
-        for _, student in students.iterrows():
-            student_perf = db.get_student_performance(student['student_id'])
-            if not student_perf.empty and student_perf['score'].mean() < 70:
-                at_risk_count += 1
-        
-        st.metric("Students at Risk", at_risk_count)
+        # Students whose recent average score is below the at-risk threshold
+        st.metric("Students at Risk", summary['at_risk'],
+                  help=f"Students averaging below {AT_RISK_SCORE}% over {recent}")
     
     with col4:
-        # Average attendance
-        all_attendance = []
-        for _, student in students.iterrows():
-            student_attendance = db.get_student_attendance(student['student_id'])
-            if not student_attendance.empty:
-                attendance_rate = (len(student_attendance[student_attendance['status'] == 'present']) / len(student_attendance)) * 100
-                all_attendance.append(attendance_rate)
-        
-        if all_attendance:
-            avg_attendance = sum(all_attendance) / len(all_attendance)
-            st.metric("Avg Attendance", f"{avg_attendance:.1f}%")
+        if summary['avg_attendance'] is not None:
+            st.metric("Avg Attendance", f"{summary['avg_attendance']:.1f}%")
         else:
             st.metric("Avg Attendance", "N/A")
     
@@ -177,40 +155,19 @@ def show_teacher_dashboard():
     # Class performance distribution
     st.subheader("📊 Class Performance Distribution")
     
-    all_scores = []
-    for _, student in students.iterrows():
-        student_perf = db.get_student_performance(student['student_id'])
-        if not student_perf.empty:
-            all_scores.extend(student_perf['score'].tolist())
+    all_scores = db.get_recent_scores()
     
-    if all_scores:
-        fig = px.histogram(x=all_scores, nbins=20,
+    if not all_scores.empty:
+        fig = px.histogram(all_scores, x='score', nbins=20,
                           title="Distribution of All Student Scores",
-                          labels={'x': 'Score (%)', 'y': 'Number of Exams'})
+                          labels={'score': 'Score (%)', 'count': 'Number of Exams'})
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Covers {recent}, the scores the averages above use.")
     
     # Student list with performance
     st.subheader("👥 Student Performance Overview")
     
-    student_performance_data = []
-    for _, student in students.iterrows():
-        student_perf = db.get_student_performance(student['student_id'])
-        student_attendance = db.get_student_attendance(student['student_id'])
-        
-        avg_score = student_perf['score'].mean() if not student_perf.empty else None
-        attendance_rate = None
-        if not student_attendance.empty:
-            attendance_rate = (len(student_attendance[student_attendance['status'] == 'present']) / len(student_attendance)) * 100
-        
-        student_performance_data.append({
-            'student_id': student['student_id'],
-            'name': f"{student['first_name']} {student['last_name']}",
-            'avg_score': avg_score,
-            'attendance_rate': attendance_rate,
-            'total_exams': len(student_perf) if not student_perf.empty else 0
-        })
-    
-    performance_df = pd.DataFrame(student_performance_data)
+    performance_df = db.get_student_metrics()
     
     if not performance_df.empty:
         # Filter options
@@ -228,31 +185,22 @@ def show_teacher_dashboard():
             (performance_df['attendance_rate'] >= min_attendance)
         ]
         
-        # Display student table
-        for _, student in filtered_df.iterrows():
-            with st.container():
-                col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
-                
-                with col1:
-                    st.markdown(f"**{student['name']}**")
-                    st.markdown(f"*{student['student_id']}*")
-                
-                with col2:
-                    if student['avg_score'] is not None:
-                        st.metric("Avg Score", f"{student['avg_score']:.1f}%")
-                    else:
-                        st.metric("Avg Score", "N/A")
-                
-                with col3:
-                    if student['attendance_rate'] is not None:
-                        st.metric("Attendance", f"{student['attendance_rate']:.1f}%")
-                    else:
-                        st.metric("Attendance", "N/A")
-                
-                with col4:
-                    st.metric("Exams", student['total_exams'])
-            
-            st.divider()
+        # One table instead of a container per student keeps large classes responsive
+        table = filtered_df.assign(name=filtered_df['first_name'] + ' ' + filtered_df['last_name'])
+        st.dataframe(
+            table[['name', 'student_id', 'avg_score', 'attendance_rate', 'total_exams']],
+            column_config={
+                'name': "Student",
+                'student_id': "Student ID",
+                'avg_score': st.column_config.NumberColumn(
+                    "Avg Score", format="%.1f%%", help=f"Average of the {RECENT_RECORDS} most recent scores"
+                ),
+                'attendance_rate': st.column_config.NumberColumn("Attendance", format="%.1f%%"),
+                'total_exams': "Exams"
+            },
+            hide_index=True,
+            use_container_width=True
+        )
 
 def show_admin_dashboard():
     """Show admin dashboard with system analytics"""
@@ -299,11 +247,7 @@ def show_admin_dashboard():
     
     with col1:
         # Performance records count
-        total_performance_records = 0
-        for _, student in students.iterrows():
-            student_perf = db.get_student_performance(student['student_id'])
-            total_performance_records += len(student_perf)
-        
+        total_performance_records = db.get_class_summary()['total_performance_records']
         st.metric("Total Performance Records", total_performance_records)
     
     with col2:
@@ -314,6 +258,47 @@ def show_admin_dashboard():
         else:
             st.metric("Avg Records per Student", "0")
     
+    # Attendance entered twice for a student and date is listed, not merged, so an administrator decides which to keep
+    duplicate_attendance = db.get_duplicate_attendance()
+    if not duplicate_attendance.empty:
+        st.warning(f"{len(duplicate_attendance)} student-days have more than one attendance record.")
+        with st.expander("🗓️ Duplicate Attendance Records"):
+            st.dataframe(
+                duplicate_attendance,
+                column_config={
+                    'student_id': "Student ID",
+                    'date': "Date",
+                    'entries': "Records",
+                    'statuses': "Statuses",
+                    'record_ids': "Record IDs"
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+    
+    # Connection pool health
+    with st.expander("🔌 Database Connection Pool"):
+        pool_stats = db.pool_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("Open Connections", pool_stats['idle'] + pool_stats['in_use'])
+        
+        with col2:
+            st.metric("Peak In Use", pool_stats['peak_in_use'])
+        
+        with col3:
+            st.metric("Connections Created", pool_stats['created'])
+        
+        with col4:
+            st.metric("Reuse Rate", f"{pool_stats['reuse_rate']:.1%}")
+        
+        checkpoints = pool_stats['checkpoints']
+        last = checkpoints['last'] or {}
+        st.caption(f"WAL checkpoints: {checkpoints['checkpoints']} "
+                   f"(every {checkpoints['interval_seconds']:.0f}s, {checkpoints['busy']} blocked by readers) · "
+                   f"last WAL size {last.get('wal_bytes', 0) / 1e6:.1f} MB")
+    
     # Grade level distribution
     if not students.empty:
         st.subheader("📚 Grade Level Distribution")
@@ -347,22 +332,10 @@ def show_analytics_page():
     # Performance analytics
     st.subheader("🎯 Performance Analytics")
     
-    all_performance_data = []
-    for _, student in students.iterrows():
-        student_perf = db.get_student_performance(student['student_id'])
-        if not student_perf.empty:
-            for _, record in student_perf.iterrows():
-                all_performance_data.append({
-                    'student_id': student['student_id'],
-                    'student_name': f"{student['first_name']} {student['last_name']}",
-                    'subject': record['subject'],
-                    'score': record['score'],
-                    'exam_type': record['exam_type'],
-                    'date_taken': record['date_taken']
-                })
-    
-    if all_performance_data:
-        performance_df = pd.DataFrame(all_performance_data)
+    performance_df = db.get_recent_scores()
+    
+    if not performance_df.empty:
+        st.caption(f"Charts cover each student's {RECENT_RECORDS} most recent scores, as on the other dashboards.")
         
         # Overall performance trends
         col1, col2 = st.columns(2)
@@ -396,23 +369,10 @@ def show_analytics_page():
     # Attendance analytics
     st.subheader("📅 Attendance Analytics")
     
-    all_attendance_data = []
-    for _, student in students.iterrows():
-        student_attendance = db.get_student_attendance(student['student_id'])
-        if not student_attendance.empty:
-            for _, record in student_attendance.iterrows():
-                all_attendance_data.append({
-                    'student_id': student['student_id'],
-                    'student_name': f"{student['first_name']} {student['last_name']}",
-                    'status': record['status'],
-                    'date': record['date']
-                })
-    
-    if all_attendance_data:
-        attendance_df = pd.DataFrame(all_attendance_data)
-        
+    status_counts = db.get_attendance_status_counts()
+    
+    if not status_counts.empty:
         # Attendance status distribution
-        status_counts = attendance_df['status'].value_counts()
-        fig = px.pie(values=status_counts.values, names=status_counts.index,
+        fig = px.pie(status_counts, values='count', names='status',
                      title="Attendance Status Distribution")
         st.plotly_chart(fig, use_container_width=True)
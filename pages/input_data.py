@@ -1,8 +1,25 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
-from data.database import db
+from data.database import db, ATTENDANCE_STATUSES
 from auth.login import get_current_user, require_role
 
+SUBJECTS = ["Mathematics", "Science", "English", "History", "Geography", "Physics", "Chemistry", "Biology"]
+EXAM_TYPES = ["Quiz", "Midterm", "Final", "Assignment", "Project"]
+
+def select_class(students, key):
+    """Filter students by grade level for the class-wide editors"""
+    grades = sorted(students['grade_level'].dropna().unique().tolist())
+    grade = st.selectbox("Class (Grade Level)", ["All students"] + grades, key=key)
+    if grade != "All students":
+        students = students[students['grade_level'] == grade]
+    return students
+
+def show_error_list(error):
+    """Show every validation message of a rejected bulk write"""
+    messages = error.args[0] if error.args and isinstance(error.args[0], list) else [str(error)]
+    st.error(f"Nothing was saved - {len(messages)} invalid record(s):\n\n" + "\n".join(f"- {m}" for m in messages))
+
 def show_performance_input_page():
     """Show performance data input page for teachers"""
     require_role(['teacher', 'admin'])
@@ -16,6 +33,80 @@ def show_performance_input_page():
         st.info("No students found. Please add students first.")
         return
     
+    tab1, tab2 = st.tabs(["👥 Whole Class", "👤 Single Student"])
+    
+    with tab1:
+        show_class_performance_input(students)
+    
+    with tab2:
+        show_single_performance_input(students)
+
+def show_class_performance_input(students):
+    """Enter one exam's scores for a whole class and save them in one transaction"""
+    students = select_class(students, "performance_class")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        subject = st.selectbox("Subject", SUBJECTS, key="class_subject")
+    
+    with col2:
+        exam_type = st.selectbox("Exam Type", EXAM_TYPES, key="class_exam_type")
+    
+    with col3:
+        max_score = st.number_input("Maximum Score", min_value=1.0, max_value=100.0, value=100.0, step=0.1, key="class_max_score")
+    
+    with col4:
+        date_taken = st.date_input("Date Taken", value=datetime.now().date(), key="class_date_taken")
+    
+    grid = pd.DataFrame({
+        'student_id': students['student_id'],
+        'name': students['first_name'] + ' ' + students['last_name'],
+        'score': pd.Series([None] * len(students), dtype='float', index=students.index),
+        'notes': ''
+    })
+    
+    with st.form("class_performance_form"):
+        # Students left without a score are skipped
+        edited = st.data_editor(
+            grid,
+            column_config={
+                'student_id': st.column_config.TextColumn("Student ID", disabled=True),
+                'name': st.column_config.TextColumn("Student", disabled=True),
+                'score': st.column_config.NumberColumn("Score", min_value=0.0, max_value=max_score, step=0.1),
+                'notes': st.column_config.TextColumn("Notes")
+            },
+            hide_index=True,
+            use_container_width=True,
+            num_rows="fixed",
+            key="class_performance_grid"
+        )
+        
+        submitted = st.form_submit_button("Save Scores for Class")
+        
+        if submitted:
+            scored = edited[edited['score'].notna()]
+            records = [{
+                'student_id': row['student_id'],
+                'subject': subject,
+                'exam_type': exam_type,
+                'score': row['score'],
+                'max_score': max_score,
+                'date_taken': date_taken,
+                'notes': row['notes']
+            } for _, row in scored.iterrows()]
+            
+            if not records:
+                st.warning("Enter at least one score.")
+            else:
+                try:
+                    count = db.add_performance_records(records, recorded_by=get_current_user()['id'])
+                    st.success(f"Saved {count} performance records.")
+                except ValueError as e:
+                    show_error_list(e)
+
+def show_single_performance_input(students):
+    """Add one performance record for a selected student"""
     # Select student
     student_options = {f"{row['first_name']} {row['last_name']} ({row['student_id']})": row['student_id'] 
                       for _, row in students.iterrows()}
@@ -29,8 +120,8 @@ def show_performance_input_page():
         col1, col2 = st.columns(2)
         
         with col1:
-            subject = st.selectbox("Subject", ["Mathematics", "Science", "English", "History", "Geography", "Physics", "Chemistry", "Biology"])
-            exam_type = st.selectbox("Exam Type", ["Quiz", "Midterm", "Final", "Assignment", "Project"])
+            subject = st.selectbox("Subject", SUBJECTS)
+            exam_type = st.selectbox("Exam Type", EXAM_TYPES)
             score = st.number_input("Score", min_value=0.0, max_value=100.0, value=75.0, step=0.1)
             max_score = st.number_input("Maximum Score", min_value=1.0, max_value=100.0, value=100.0, step=0.1)
         
@@ -67,6 +158,59 @@ def show_attendance_input_page():
         st.info("No students found. Please add students first.")
         return
     
+    tab1, tab2 = st.tabs(["👥 Whole Class", "👤 Single Student"])
+    
+    with tab1:
+        show_class_attendance_input(students)
+    
+    with tab2:
+        show_single_attendance_input(students)
+
+def show_class_attendance_input(students):
+    """Mark a day's attendance for a whole class and save it in one transaction"""
+    students = select_class(students, "attendance_class")
+    date = st.date_input("Date", value=datetime.now().date(), key="class_attendance_date")
+    
+    grid = pd.DataFrame({
+        'student_id': students['student_id'],
+        'name': students['first_name'] + ' ' + students['last_name'],
+        'status': 'present',
+        'notes': ''
+    })
+    
+    with st.form("class_attendance_form"):
+        edited = st.data_editor(
+            grid,
+            column_config={
+                'student_id': st.column_config.TextColumn("Student ID", disabled=True),
+                'name': st.column_config.TextColumn("Student", disabled=True),
+                'status': st.column_config.SelectboxColumn("Status", options=list(ATTENDANCE_STATUSES), required=True),
+                'notes': st.column_config.TextColumn("Notes")
+            },
+            hide_index=True,
+            use_container_width=True,
+            num_rows="fixed",
+            key="class_attendance_grid"
+        )
+        
+        submitted = st.form_submit_button("Save Attendance for Class")
+        
+        if submitted:
+            records = [{
+                'student_id': row['student_id'],
+                'date': date,
+                'status': row['status'],
+                'notes': row['notes']
+            } for _, row in edited.iterrows()]
+            
+            try:
+                count = db.add_attendance_records(records, recorded_by=get_current_user()['id'])
+                st.success(f"Saved attendance for {count} students.")
+            except ValueError as e:
+                show_error_list(e)
+
+def show_single_attendance_input(students):
+    """Add one attendance record for a selected student"""
     # Select student
     student_options = {f"{row['first_name']} {row['last_name']} ({row['student_id']})": row['student_id'] 
                       for _, row in students.iterrows()}
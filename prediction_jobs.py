@@ -0,0 +1,244 @@
+import os
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from flask import current_app
+from sqlalchemy import func
+from models import db, StudentProfile, Prediction, PredictionJob, Counterfactual
+from model.parallel import ScorerPool, SCORING_WORKERS
+from model.registry import registry
+import prediction_service
+
+logger = logging.getLogger(__name__)
+
+# Number of background workers processing queued jobs in this process
+JOB_WORKERS = int(os.environ.get('PREDICTION_JOB_WORKERS', 2))
+
+# Students scored and committed per chunk; progress is reported at this granularity
+JOB_CHUNK_SIZE = int(os.environ.get('PREDICTION_JOB_CHUNK_SIZE', 2000))
+
+# Chunk size for parallel jobs; larger chunks amortize the hand-off to the scoring processes
+PARALLEL_JOB_CHUNK_SIZE = int(os.environ.get('PARALLEL_JOB_CHUNK_SIZE', 50000))
+
+# Full jobs score every matched student; incremental jobs only those whose
+# profile changed since their last prediction with the active model version;
+# counterfactual jobs search paths to passing for the matched at-risk students
+JOB_MODES = ('full', 'incremental', 'counterfactual')
+
+# Filters accepted when enqueuing a job, mapped to the profile column they match
+JOB_FILTERS = {
+    'school_type': StudentProfile.school_type,
+    'gender': StudentProfile.gender,
+}
+
+executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='prediction-job')
+
+# Scoring processes for parallel jobs, kept across jobs and restarted when the model changes
+scorer_pool = ScorerPool(SCORING_WORKERS)
+registry.on_swap(scorer_pool.on_swap)
+
+def validate_filters(filters):
+    """Return an error message for unsupported filters, or None if they are valid"""
+    if not isinstance(filters, dict):
+        return 'Filters must be an object'
+    unknown = [key for key in filters if key not in JOB_FILTERS and key != 'all']
+    if unknown:
+        return f'Unsupported filters: {unknown}'
+    return None
+
+def submit_job(filters, created_by=None, parallel=False, mode='full', explain=False):
+    """Create a queued job and hand it to the in-process worker pool.
+
+    Parallel jobs, meant for nightly full re-scoring, shard each chunk across a
+    pool of scoring processes. With explain, every stored prediction includes
+    its top feature contributions.
+    """
+    job = PredictionJob(
+        mode=mode,
+        filters=filters,
+        model_version=registry.get().version,
+        created_by=created_by
+    )
+    db.session.add(job)
+    db.session.commit()
+    
+    app = current_app._get_current_object()
+    executor.submit(run_job, app, job.job_id, parallel, explain)
+    return job
+
+def filtered_students(query, filters):
+    """Apply a job's filters to a query over student_profiles"""
+    for key, value in filters.items():
+        if key in JOB_FILTERS:
+            query = query.filter(JOB_FILTERS[key] == value)
+    return query
+
+def select_student_ids(filters):
+    """IDs of the students matched by a job's filters, in paging order"""
+    query = filtered_students(db.session.query(StudentProfile.student_id), filters)
+    return [row.student_id for row in query.order_by(StudentProfile.student_id)]
+
+def select_stale_student_ids(filters, model_version):
+    """IDs of matched students without a prediction from model_version newer than their profile"""
+    changed_at = func.coalesce(StudentProfile.updated_at, StudentProfile.created_at)
+    fresh = db.session.query(Prediction.prediction_id).filter(
+        Prediction.student_id == StudentProfile.student_id,
+        Prediction.model_version == model_version,
+        Prediction.created_at >= changed_at
+    )
+    query = filtered_students(db.session.query(StudentProfile.student_id), filters).filter(~fresh.exists())
+    return [row.student_id for row in query.order_by(StudentProfile.student_id)]
+
+def count_students(filters):
+    """Number of students matched by a job's filters"""
+    return filtered_students(db.session.query(func.count(StudentProfile.student_id)), filters).scalar()
+
+def run_job(app, job_id, parallel=False, explain=False):
+    """Score the students selected by a job, committing one chunk at a time.
+
+    Incremental jobs select only students changed since their last prediction
+    with the active model version, upsert their predictions and record the
+    rest as skipped. Counterfactual jobs store paths to passing for the
+    students that are at risk and record the others as skipped.
+    """
+    with app.app_context():
+        job = PredictionJob.query.get(job_id)
+        scorer = None
+        checkout = ExitStack()
+        try:
+            # The whole job scores with one model version, even if another is activated meanwhile
+            model = registry.get()
+            filters = job.filters or {}
+            if job.mode == 'incremental':
+                student_ids = select_stale_student_ids(filters, model.version)
+                job.skipped_students = count_students(filters) - len(student_ids)
+                store = prediction_service.upsert_predictions
+            elif job.mode == 'counterfactual':
+                student_ids = select_student_ids(filters)
+                store = None
+            else:
+                student_ids = select_student_ids(filters)
+                store = prediction_service.store_predictions
+            job.status = 'running'
+            job.model_version = model.version
+            job.started_at = datetime.utcnow()
+            job.total_students = len(student_ids)
+            db.session.commit()
+            
+            chunk_size = JOB_CHUNK_SIZE
+            if parallel and not model.is_mock and SCORING_WORKERS > 1:
+                # Workers refuse to score if the bundle on disk is no longer this version
+                scorer = checkout.enter_context(scorer_pool.checkout(model))
+                chunk_size = PARALLEL_JOB_CHUNK_SIZE
+            
+            for start in range(0, len(student_ids), chunk_size):
+                profiles = prediction_service.load_profiles(student_ids[start:start + chunk_size])
+                if store is None:
+                    at_risk = prediction_service.store_counterfactuals(profiles, job_id=job_id, model=model)
+                    job.skipped_students += len(profiles) - at_risk
+                    job.processed_students += len(profiles)
+                else:
+                    job.processed_students += store(
+                        profiles, job_id=job_id, scorer=scorer, model=model, explain=explain
+                    )
+                db.session.commit()
+            
+            job.status = 'completed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            
+        except Exception as e:
+            logger.error(f"Prediction job {job_id} failed: {e}")
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        finally:
+            checkout.close()
+            db.session.remove()
+
+def job_to_dict(job):
+    """Serialize job progress, including throughput and an estimate of time remaining"""
+    elapsed = None
+    throughput = None
+    eta_seconds = None
+    
+    if job.started_at:
+        elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+        if elapsed > 0:
+            throughput = round(job.processed_students / elapsed, 2)
+        if throughput and job.status == 'running':
+            eta_seconds = round((job.total_students - job.processed_students) / throughput, 1)
+    
+    return {
+        'job_id': job.job_id,
+        'status': job.status,
+        'mode': job.mode,
+        'filters': job.filters,
+        'model_version': job.model_version,
+        'total_students': job.total_students,
+        'processed_students': job.processed_students,
+        'skipped_students': job.skipped_students,
+        'progress': round(job.processed_students / job.total_students, 4) if job.total_students else 0.0,
+        'throughput_per_second': throughput,
+        'elapsed_seconds': elapsed,
+        'eta_seconds': eta_seconds,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+def get_job_results(job, cursor=None, limit=500):
+    """Page through a job's results ordered by student ID.
+
+    The cursor is the last student ID of the previous page; next_cursor is None
+    once the final page has been returned.
+    """
+    if job.mode == 'counterfactual':
+        return get_counterfactual_results(job.job_id, cursor, limit)
+
+    query = Prediction.query.filter(Prediction.job_id == job.job_id)
+    if cursor:
+        query = query.filter(Prediction.student_id > cursor)
+    page = query.order_by(Prediction.student_id).limit(limit + 1).all()
+    
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    return {
+        'results': [prediction_service.prediction_to_dict(prediction) for prediction in page],
+        'next_cursor': page[-1].student_id if has_more else None
+    }
+
+def get_counterfactual_results(job_id, cursor=None, limit=500):
+    """Page through a counterfactual job's paths, grouped per student"""
+    query = db.session.query(Counterfactual.student_id).filter(Counterfactual.job_id == job_id).distinct()
+    if cursor:
+        query = query.filter(Counterfactual.student_id > cursor)
+    student_ids = [row.student_id for row in query.order_by(Counterfactual.student_id).limit(limit + 1)]
+    
+    has_more = len(student_ids) > limit
+    student_ids = student_ids[:limit]
+    
+    paths = {}
+    if student_ids:
+        rows = Counterfactual.query.filter(
+            Counterfactual.job_id == job_id,
+            Counterfactual.student_id.in_(student_ids)
+        ).order_by(Counterfactual.student_id, Counterfactual.rank)
+        for row in rows:
+            paths.setdefault(row.student_id, []).append(prediction_service.path_to_dict({
+                'changes': row.changes,
+                'cost': row.cost,
+                'predicted_score': row.predicted_score,
+                'confidence_level': row.confidence_level,
+                'performance_category': row.performance_category
+            }))
+    
+    return {
+        'results': [{'student_id': student_id, 'paths': paths[student_id]} for student_id in student_ids],
+        'next_cursor': student_ids[-1] if has_more else None
+    }
@@ -0,0 +1,311 @@
+import os
+import logging
+from datetime import datetime
+from sqlalchemy import bindparam
+from models import db, StudentProfile, Prediction, Counterfactual
+from model.scoring import (
+    PROFILE_FEATURES, EXTRA_ATTRIBUTES, PERFORMANCE_LABELS,
+    profiles_to_columns, encode_batch, score_encoded
+)
+from model.registry import registry
+from model.counterfactual import CounterfactualSearch
+from model.batcher import MicroBatcher
+from model.shadow import ShadowScorer
+from model.explain import explain_encoded, explanation_to_dict
+from model.cache import LRUCache, feature_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement, so large ID lists are queried in chunks
+PROFILE_QUERY_CHUNK = 900
+
+# Maximum number of predictions kept in the in-process cache
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+
+# Concurrent single-student predictions are coalesced for up to this many milliseconds;
+# 0 scores every request on its own
+PREDICTION_BATCH_WINDOW_MS = float(os.environ.get('PREDICTION_BATCH_WINDOW_MS', 2))
+PREDICTION_MAX_BATCH = int(os.environ.get('PREDICTION_MAX_BATCH', 64))
+
+batcher = MicroBatcher(PREDICTION_BATCH_WINDOW_MS, PREDICTION_MAX_BATCH)
+
+# Prediction batches waiting for the shadow candidate; copies beyond this are dropped
+SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', 1000))
+
+shadow = ShadowScorer(SHADOW_QUEUE_SIZE)
+
+LABEL_CATEGORIES = {label: category for category, label in PERFORMANCE_LABELS.items()}
+
+# Features listed per explanation stored with job predictions, and the fields kept;
+# the prediction itself is already in the row
+JOB_EXPLANATION_FEATURES = 5
+EXPLANATION_FIELDS = ('category_bias', 'category_contributions', 'score_bias', 'score_contributions')
+
+# Counterfactual search spaces, built once per model version
+counterfactual_searches = {}
+
+# In-process LRU in front of the predictions table, keyed by (student_id, feature_hash)
+prediction_cache = LRUCache(PREDICTION_CACHE_SIZE)
+
+# Load the exported array-backed models in the background; /api/health reports when they are ready
+registry.preload()
+
+def load_profiles(student_ids):
+    """Load the scoring columns for many students with as few queries as possible"""
+    unique_ids = list(dict.fromkeys(student_ids))
+    columns = [StudentProfile.student_id, StudentProfile.first_name, StudentProfile.last_name]
+    columns += [getattr(StudentProfile, attribute) for attribute, _ in PROFILE_FEATURES + EXTRA_ATTRIBUTES]
+
+    found = {}
+    for start in range(0, len(unique_ids), PROFILE_QUERY_CHUNK):
+        chunk = unique_ids[start:start + PROFILE_QUERY_CHUNK]
+        rows = db.session.query(*columns).filter(StudentProfile.student_id.in_(chunk)).all()
+        for row in rows:
+            found[row.student_id] = row
+
+    # Preserve the order of the request and skip unknown IDs
+    return [found[student_id] for student_id in unique_ids if student_id in found]
+
+def prediction_to_dict(prediction):
+    """Serialize a stored prediction for API responses"""
+    return {
+        'student_id': prediction.student_id,
+        'predicted_score': prediction.predicted_score,
+        'confidence_level': prediction.confidence_level,
+        'performance_category': PERFORMANCE_LABELS.get(prediction.performance_category, 'Unknown'),
+        'prediction_date': prediction.created_at.isoformat() if prediction.created_at else None,
+        'model_version': prediction.model_version,
+        'explanation': prediction.explanation
+    }
+
+def shadow_copy(columns, scores, categories, model):
+    """Hand a copy of live predictions to the shadow candidate, if one is running"""
+    if shadow.candidate is not None and not model.is_mock:
+        shadow.submit(columns, scores, categories, model.version)
+
+def get_student_prediction(profile):
+    """Return the prediction for a student, evaluating the model only on a cache miss.
+
+    Lookups go through the in-process LRU first, then the predictions table, and only
+    then score the student and persist the result. Mock predictions, made while no
+    model is loaded, are random and are returned without being cached or stored.
+    """
+    model = registry.get()
+    columns = profiles_to_columns([profile])
+    raw = encode_batch(columns, model.models)
+    if model.is_mock:
+        predicted_scores, confidences, categories = score_encoded(raw, columns, model.models)
+        return prediction_to_dict(Prediction(
+            student_id=profile.student_id,
+            predicted_score=float(predicted_scores[0]),
+            confidence_level=float(confidences[0]),
+            performance_category=int(categories[0]),
+            model_version=model.version,
+            created_at=datetime.utcnow()
+        ))
+
+    feature_hash = feature_fingerprint(raw[0].tobytes(), model.version)
+    key = (profile.student_id, feature_hash)
+
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        shadow_copy(columns, [cached['predicted_score']], [LABEL_CATEGORIES[cached['performance_category']]], model)
+        return cached
+
+    prediction = Prediction.query.filter_by(
+        student_id=profile.student_id,
+        feature_hash=feature_hash,
+        model_version=model.version
+    ).order_by(Prediction.created_at.desc()).first()
+
+    if prediction is None:
+        if PREDICTION_BATCH_WINDOW_MS > 0:
+            predicted_score, confidence, category = batcher.score(raw[0], model)
+        else:
+            predicted_scores, confidences, categories = score_encoded(raw, columns, model.models)
+            predicted_score, confidence, category = float(predicted_scores[0]), float(confidences[0]), int(categories[0])
+        prediction = Prediction(
+            student_id=profile.student_id,
+            predicted_score=predicted_score,
+            confidence_level=confidence,
+            performance_category=category,
+            prediction_date=datetime.utcnow().date(),
+            model_version=model.version,
+            feature_hash=feature_hash,
+            created_at=datetime.utcnow()
+        )
+        db.session.add(prediction)
+        db.session.commit()
+
+    result = prediction_to_dict(prediction)
+    prediction_cache.put(key, result)
+    shadow_copy(columns, [prediction.predicted_score], [prediction.performance_category], model)
+    return result
+
+def score_profiles(profiles, job_id=None, scorer=None, model=None, explain=False):
+    """Score a batch of profiles in one model call and return prediction rows ready to insert.
+
+    When a ShardedScorer is given and real models are loaded, the batch is scored
+    across its worker processes instead of in this process. model defaults to the
+    active version; callers scoring several batches pass one snapshot for all of them.
+    With explain, each row also carries its top feature contributions, computed in
+    the same forest traversal as the prediction. Mock predictions are never stored,
+    so scoring without a loaded model raises.
+    """
+    model = model or registry.get()
+    if model.is_mock:
+        raise RuntimeError('No model loaded - mock predictions are not stored')
+    columns = profiles_to_columns(profiles)
+    raw = encode_batch(columns, model.models)
+    explanations = [None] * len(profiles)
+    if explain:
+        explanation = explain_encoded(raw, model.models)
+        predicted_scores = explanation['predicted_scores']
+        confidence = explanation['confidence']
+        categories = explanation['categories']
+        explanations = []
+        for i in range(len(profiles)):
+            described = explanation_to_dict(explanation, i, top=JOB_EXPLANATION_FEATURES)
+            explanations.append({key: described[key] for key in EXPLANATION_FIELDS})
+    elif scorer is not None:
+        predicted_scores, confidence, categories = scorer.score(raw)
+    else:
+        predicted_scores, confidence, categories = score_encoded(raw, columns, model.models)
+    now = datetime.utcnow()
+
+    return [{
+        'student_id': profile.student_id,
+        'predicted_score': float(predicted_scores[i]),
+        'confidence_level': float(confidence[i]),
+        'performance_category': int(categories[i]),
+        'prediction_date': now.date(),
+        'model_version': model.version,
+        'feature_hash': feature_fingerprint(raw[i].tobytes(), model.version),
+        'job_id': job_id,
+        'explanation': explanations[i],
+        'created_at': now
+    } for i, profile in enumerate(profiles)]
+
+def store_predictions(profiles, job_id=None, scorer=None, model=None, explain=False):
+    """Score a batch of profiles and insert the results into predictions"""
+    if not profiles:
+        return 0
+
+    rows = score_profiles(profiles, job_id, scorer, model, explain)
+    db.session.execute(Prediction.__table__.insert(), rows)
+    return len(rows)
+
+def upsert_predictions(profiles, job_id=None, scorer=None, model=None, explain=False):
+    """Score a batch of profiles and upsert the results into predictions.
+
+    A row with the same (student_id, feature_hash, model_version) is updated in
+    place, so re-scoring a student whose model inputs did not change refreshes
+    its prediction instead of adding a duplicate.
+    """
+    if not profiles:
+        return 0
+
+    rows = score_profiles(profiles, job_id, scorer, model, explain)
+    table = Prediction.__table__
+    existing = {}
+    for start in range(0, len(rows), PROFILE_QUERY_CHUNK):
+        chunk = [row['student_id'] for row in rows[start:start + PROFILE_QUERY_CHUNK]]
+        query = db.session.query(Prediction.prediction_id, Prediction.student_id, Prediction.feature_hash).filter(
+            Prediction.student_id.in_(chunk),
+            Prediction.model_version == rows[0]['model_version']
+        )
+        for prediction_id, student_id, feature_hash in query:
+            existing[(student_id, feature_hash)] = prediction_id
+
+    updates = []
+    inserts = []
+    for row in rows:
+        prediction_id = existing.get((row['student_id'], row['feature_hash']))
+        if prediction_id is None:
+            inserts.append(row)
+        else:
+            updates.append(dict(row, b_prediction_id=prediction_id))
+
+    if updates:
+        db.session.execute(
+            table.update().where(table.c.prediction_id == bindparam('b_prediction_id')).values(
+                predicted_score=bindparam('predicted_score'),
+                confidence_level=bindparam('confidence_level'),
+                performance_category=bindparam('performance_category'),
+                prediction_date=bindparam('prediction_date'),
+                job_id=bindparam('job_id'),
+                explanation=bindparam('explanation'),
+                created_at=bindparam('created_at')
+            ),
+            updates
+        )
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    return len(rows)
+
+def explain_profiles(profiles, model=None, top=None):
+    """Predictions with per-feature contributions for a batch of profiles"""
+    model = model or registry.get()
+    explanation = explain_encoded(encode_batch(profiles_to_columns(profiles), model.models), model.models)
+    return [dict(explanation_to_dict(explanation, i, top), student_id=profile.student_id)
+            for i, profile in enumerate(profiles)]
+
+def path_to_dict(path):
+    """Serialize a counterfactual path for API responses"""
+    return dict(path, performance_category=PERFORMANCE_LABELS.get(path['performance_category'], 'Unknown'))
+
+def find_paths_to_passing(profiles, model=None):
+    """Cheapest actionable changes out of "At Risk" for each profile.
+
+    Returns one list of paths per profile, or None for profiles that are not at risk.
+    """
+    model = model or registry.get()
+    search = counterfactual_searches.get(model.version)
+    if search is None:
+        search = counterfactual_searches[model.version] = CounterfactualSearch(model.models)
+    return search.search(encode_batch(profiles_to_columns(profiles), model.models))
+
+def store_counterfactuals(profiles, job_id=None, model=None):
+    """Search paths for a batch of profiles and insert them; returns the number of at-risk students"""
+    if not profiles:
+        return 0
+
+    model = model or registry.get()
+    now = datetime.utcnow()
+    rows = []
+    at_risk = 0
+    for profile, paths in zip(profiles, find_paths_to_passing(profiles, model)):
+        if paths is None:
+            continue
+        at_risk += 1
+        rows.extend({
+            'job_id': job_id,
+            'student_id': profile.student_id,
+            'rank': rank,
+            'changes': path['changes'],
+            'cost': path['cost'],
+            'predicted_score': path['predicted_score'],
+            'confidence_level': path['confidence_level'],
+            'performance_category': path['performance_category'],
+            'model_version': model.version,
+            'created_at': now
+        } for rank, path in enumerate(paths, 1))
+
+    if rows:
+        db.session.execute(Counterfactual.__table__.insert(), rows)
+    return at_risk
+
+def invalidate_students(student_ids):
+    """Drop cached predictions for students whose profile changed.
+
+    Stored rows do not need deleting: their feature hash no longer matches the
+    updated profile, so they are never served again but remain as history.
+    """
+    student_ids = set(student_ids)
+    prediction_cache.invalidate(lambda key: key[0] in student_ids)
+
+def invalidate_model(*_):
+    """Drop every cached prediction, e.g. after the active model changes"""
+    prediction_cache.clear()
+
+registry.on_swap(invalidate_model)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for the database path of the warm-start model update (python -m model.update)
+
+Builds a Streamlit database and an API database with their real schemas in a
+temporary directory, records exam scores in the first and student features in
+the second, and runs the update's loading and a dry-run update on them.
+"""
+
+import os
+import sys
+import tempfile
+import pandas as pd
+from flask import Flask
+from data.database import DatabaseManager
+from models import db, StudentProfile
+from model.forest import MODEL_DIR
+from model.bundle import BUNDLE_FILE
+from model.scoring import PROFILE_FEATURES
+from model.update import MIN_UPDATE_ROWS, load_recent_records, run_update
+
+STUDENTS = 2 * MIN_UPDATE_ROWS
+
+def create_streamlit_db(path, dataset):
+    """Students and their exam scores in the Streamlit schema"""
+    manager = DatabaseManager(path)
+    manager.checkpointer.stop()
+    for i, row in enumerate(dataset.itertuples(index=False)):
+        manager.create_user(f'student{i}', f'student{i}@school.edu', 'Student123!', 'student')
+        manager.create_student_profile(i + 1, {
+            'student_id': f'STU{i:05d}', 'first_name': 'Test', 'last_name': str(i), 'age': 16,
+            'gender': row.Gender, 'grade_level': '10', 'school_name': 'Test School'
+        })
+    manager.add_performance_records([{
+        'student_id': f'STU{i:05d}', 'subject': 'Mathematics', 'exam_type': 'Midterm',
+        'score': float(score), 'date_taken': '2024-03-01'
+    } for i, score in enumerate(dataset['Previous_Scores'])], recorded_by=1)
+    manager.pool.close_all()
+
+def create_api_db(url, dataset):
+    """The same students with their model features in the API schema"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        rows = []
+        for i, record in enumerate(dataset.to_dict('records')):
+            profile = {attribute: record[column] for attribute, column in PROFILE_FEATURES}
+            rows.append(dict(profile, student_id=f'STU{i:05d}', first_name='Test', last_name=str(i)))
+        db.session.execute(StudentProfile.__table__.insert(), rows)
+        db.session.commit()
+        db.engine.dispose()
+
+def test_load_recent_records(streamlit_path, api_url):
+    """Test that scores and features are joined across the two schemas"""
+    print("Testing loading of recent records...")
+    try:
+        columns, scores = load_recent_records(streamlit_path, '2000-01-01', api_url)
+        missing = [column for _, column in PROFILE_FEATURES if any(value is None for value in columns[column])]
+        if len(scores) == STUDENTS and not missing:
+            print(f"✅ Loaded {len(scores)} students with all {len(PROFILE_FEATURES)} features")
+            return columns, scores
+        print(f"❌ Loaded {len(scores)} of {STUDENTS} students, features missing: {missing}")
+        return None
+    except Exception as e:
+        print(f"❌ Loading recent records error: {e}")
+        return None
+
+def test_rejects_streamlit_profiles(streamlit_path):
+    """Test that the Streamlit student_profiles table is refused as a feature source"""
+    print("Testing feature source validation...")
+    try:
+        load_recent_records(streamlit_path, '2000-01-01', f'sqlite:///{streamlit_path}')
+        print("❌ Streamlit student_profiles accepted as a feature source")
+        return False
+    except ValueError as e:
+        print(f"✅ Rejected with: {e}")
+        return True
+
+def test_dry_run(columns, scores, output_path):
+    """Test a dry-run update on the loaded records"""
+    print("Testing dry-run update...")
+    bundle_path = os.path.join(MODEL_DIR, BUNDLE_FILE)
+    if not os.path.exists(bundle_path):
+        print("⚠️ Model bundle not found - skipped. Run `python -m model.train --quick` first")
+        return True
+    try:
+        report = run_update(bundle_path, columns, scores, output_path, dry_run=True, n_jobs=1)
+        if not report['published'] and not os.path.exists(output_path):
+            print(f"✅ Dry run validated {report['rows']} rows without publishing")
+            return True
+        print("❌ Dry run published a bundle")
+        return False
+    except Exception as e:
+        print(f"❌ Dry-run update error: {e}")
+        return False
+
+def main():
+    """Run all model update tests"""
+    print("=" * 50)
+    print("Model Update Tests")
+    print("=" * 50)
+
+    dataset = pd.read_csv(os.path.join(MODEL_DIR, 'cleaned_dataset.csv')).head(STUDENTS)
+    with tempfile.TemporaryDirectory() as tmp:
+        streamlit_path = os.path.join(tmp, 'student_performance.db')
+        api_url = f"sqlite:///{os.path.join(tmp, 'api.db')}"
+        create_streamlit_db(streamlit_path, dataset)
+        create_api_db(api_url, dataset)
+
+        loaded = test_load_recent_records(streamlit_path, api_url)
+        results = [loaded is not None, test_rejects_streamlit_profiles(streamlit_path)]
+        if loaded is not None:
+            results.append(test_dry_run(*loaded, os.path.join(tmp, 'updated.bundle')))
+
+    print("\n" + "=" * 50)
+    if all(results):
+        print("✅ All tests completed successfully!")
+    else:
+        print(f"❌ {results.count(False)} of {len(results)} tests failed")
+    print("=" * 50)
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script checking that DatabaseManager lookups use the schema migration indexes
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from data.database import DatabaseManager
+from data.migrations import SCHEMA_VERSION, schema_version
+from data.storage import apply_storage_profile
+
+class DedicatedConnection(sqlite3.Connection):
+    """One connection serving every DatabaseManager call of the test.
+    
+    close() only resets what the pool resets on release, so the trace callback
+    stays installed regardless of how the pool would hand out connections.
+    """
+    
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+        self.row_factory = None
+
+def dedicated_connection(db):
+    """Route every get_connection() of db to one new connection and return it"""
+    conn = sqlite3.connect(db.db_path, factory=DedicatedConnection)
+    apply_storage_profile(conn)
+    db.get_connection = lambda: conn
+    return conn
+
+def capture_queries(conn, call):
+    """Run a DatabaseManager call and return the queries it sent, with parameters bound"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+def query_plan(conn, sql):
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+
+# DatabaseManager lookup -> plan details its queries must contain; for the
+# class-wide aggregates, the index each records table is read through
+LOOKUPS = [
+    ("get_student_performance", lambda db: db.get_student_performance('STU001'),
+     ('idx_performance_records_student_date',)),
+    ("get_performance_summary", lambda db: db.get_performance_summary('STU001'),
+     ('idx_performance_records_student_date',)),
+    ("get_student_attendance", lambda db: db.get_student_attendance('STU001'),
+     ('idx_attendance_records_student_date',)),
+    ("get_student_attendance (date range)",
+     lambda db: db.get_student_attendance('STU001', start_date='2024-01-01', end_date='2024-06-30'),
+     ('idx_attendance_records_student_date',)),
+    ("get_user_notifications", lambda db: db.get_user_notifications(1),
+     ('idx_notifications_user_read_created',)),
+    ("get_user_notifications (unread)", lambda db: db.get_user_notifications(1, unread_only=True),
+     ('idx_notifications_user_read_created',)),
+    ("get_student_recommendations", lambda db: db.get_student_recommendations('STU001'),
+     ('idx_recommendations_student_created',)),
+    ("get_student_profile", lambda db: db.get_student_profile(1),
+     ('idx_student_profiles_user_id',)),
+    ("get_student_metrics", lambda db: db.get_student_metrics(),
+     ('idx_performance_records_student_date', 'idx_attendance_records_student_date')),
+    ("get_class_summary", lambda db: db.get_class_summary(),
+     ('idx_performance_records_student_date', 'idx_attendance_records_student_date')),
+    ("get_recent_scores", lambda db: db.get_recent_scores(),
+     ('idx_performance_records_student_date',)),
+    ("get_duplicate_attendance", lambda db: db.get_duplicate_attendance(),
+     ('idx_attendance_records_student_date',)),
+    # Counts every record, so the attendance table is scanned; each record's student is looked up by key
+    ("get_attendance_status_counts", lambda db: db.get_attendance_status_counts(),
+     ('SEARCH sp USING INDEX', 'SEARCH u USING INTEGER PRIMARY KEY')),
+]
+
+def test_migrations(db):
+    """Test that a new database is migrated to the latest schema version"""
+    print("Testing schema migrations...")
+    conn = db.get_connection()
+    version = schema_version(conn)
+    conn.close()
+    if version == SCHEMA_VERSION:
+        print(f"✅ Schema at version {version}")
+        return True
+    print(f"❌ Schema at version {version}, expected {SCHEMA_VERSION}")
+    return False
+
+def test_migrations_idempotent(db_path):
+    """Test that reopening a migrated database applies nothing twice"""
+    print("Testing migrations on reopen...")
+    try:
+        DatabaseManager(db_path)
+        print("✅ Reopening a migrated database succeeded")
+        return True
+    except Exception as e:
+        print(f"❌ Reopening a migrated database failed: {e}")
+        return False
+
+def test_query_plan(db, conn, name, call, expected):
+    """Test that the SELECTs a lookup runs have every expected detail in their plans"""
+    print(f"Testing query plan of {name}...")
+    statements = capture_queries(conn, lambda: call(db))
+    if not statements:
+        print(f"❌ {name} ran no queries")
+        return False
+    
+    details = [detail for sql in statements for detail in query_plan(conn, sql)]
+    missing = [item for item in expected if not any(item in detail for detail in details)]
+    if not missing:
+        print(f"✅ {name} uses {', '.join(expected)}")
+        return True
+    print(f"❌ {name} does not use {', '.join(missing)}: {details}")
+    return False
+
+def main():
+    """Run all query plan tests"""
+    print("=" * 50)
+    print("Query Plan Tests")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'query_plans.db')
+        db = DatabaseManager(db_path)
+        db.checkpointer.stop()
+
+        results = [test_migrations(db), test_migrations_idempotent(db_path)]
+        conn = dedicated_connection(db)
+        for name, call, expected in LOOKUPS:
+            results.append(test_query_plan(db, conn, name, call, expected))
+        sqlite3.Connection.close(conn)
+        db.pool.close_all()
+
+    print("\n" + "=" * 50)
+    if all(results):
+        print("✅ All tests completed successfully!")
+    else:
+        print(f"❌ {results.count(False)} of {len(results)} tests failed")
+    print("=" * 50)
+    return all(results)
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
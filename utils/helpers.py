@@ -1,7 +1,19 @@
 import streamlit as st
+import plotly.express as px
 from datetime import datetime, timedelta
 from data.database import db
 from model.predictor import load_models, make_predictions, get_performance_label
+from model.sweep import run_sweep
+from model.explain import explain_encoded, explanation_to_dict
+
+# Features offered in the what-if panel with their label and slider bounds
+SWEEP_RANGES = {
+    'attendance': ("Attendance (%)", 50, 100),
+    'hours_studied': ("Hours Studied", 5, 35),
+    'sleep_hours': ("Sleep Hours", 4, 12),
+    'tutoring_sessions': ("Tutoring Sessions", 0, 10),
+    'physical_activity': ("Physical Activity (hours/week)", 0, 10),
+}
 
 def show_notifications_sidebar():
     """Show notifications in sidebar"""
@@ -338,12 +350,14 @@ def show_prediction_page():
     st.markdown("## 🎯 Performance Prediction")
     
     # Load models
-    classifier, regressor, label_encoders, scaler_classifier, scaler_regressor, feature_importance = load_models()
+    model = load_models()
     
-    if classifier is None:
+    if model is None or model.is_mock:
         st.error("Failed to load models. Please check the model files.")
         return
     
+    st.caption(f"Model version: {model.version}")
+    
     # Create input form
     with st.form("prediction_form"):
         st.subheader("Student Information")
@@ -407,10 +421,11 @@ def show_prediction_page():
                 'Distance_from_Home': distance_from_home
             }
             
+            # Keep the inputs so the what-if panel can sweep around them after reruns
+            st.session_state['prediction_input'] = input_data
+            
             # Make predictions
-            performance_category, predicted_score, performance_probs = make_predictions(
-                input_data, classifier, regressor, label_encoders, scaler_classifier, scaler_regressor
-            )
+            performance_category, predicted_score, performance_probs = make_predictions(input_data, model)
             
             if performance_category is not None:
                 # Display results
@@ -449,6 +464,9 @@ def show_prediction_page():
                     
                     st.markdown("</div>", unsafe_allow_html=True)
                 
+                # Per-feature contributions behind this prediction
+                show_explanation_panel(input_data, model)
+                
                 # Generate recommendations
                 if st.button("Generate Recommendations"):
                     recommendations = generate_performance_recommendations(
@@ -456,3 +474,69 @@ def show_prediction_page():
                     )
                     save_recommendations_to_db("STU0001", recommendations)
                     st.success("Recommendations generated! Check the Recommendations page.")
+    
+    if 'prediction_input' in st.session_state:
+        show_sweep_panel(st.session_state['prediction_input'], model)
+
+def show_explanation_panel(input_data, model, top=8):
+    """Bar charts of the features that pushed this prediction up or down"""
+    explanation = explain_encoded(model.models[0].encode(input_data), model.models)
+    described = explanation_to_dict(explanation, 0, top=top)
+    
+    st.markdown("### 🔍 Why This Prediction?")
+    col1, col2 = st.columns(2)
+    
+    charts = [
+        (col1, described['category_contributions'], f"Effect on {described['performance_category']} probability"),
+        (col2, described['score_contributions'], "Effect on predicted score"),
+    ]
+    for column, contributions, title in charts:
+        with column:
+            features = [item['feature'].replace('_', ' ').title() for item in contributions][::-1]
+            values = [item['contribution'] for item in contributions][::-1]
+            fig = px.bar(
+                x=values, y=features, orientation='h', title=title,
+                color=['Raises' if value > 0 else 'Lowers' for value in values],
+                color_discrete_map={'Raises': '#2ca02c', 'Lowers': '#d62728'},
+                labels={'x': 'Contribution', 'y': '', 'color': ''}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+def show_sweep_panel(input_data, model):
+    """What-if panel: vary one or two features and plot the predicted score surface"""
+    st.markdown("---")
+    st.markdown("## 🔬 What-If Analysis")
+    
+    features = st.multiselect(
+        "Features to vary (up to 2)",
+        list(SWEEP_RANGES),
+        format_func=lambda feature: SWEEP_RANGES[feature][0],
+        max_selections=2
+    )
+    
+    grids = []
+    for feature in features:
+        label, low, high = SWEEP_RANGES[feature]
+        start, stop = st.slider(f"{label} range", low, high, (low, high), key=f"sweep_{feature}")
+        grids.append((feature, list(range(start, stop + 1))))
+    
+    if grids and st.button("📈 Run What-If Sweep"):
+        # Every combination is scored in a single model call
+        result = run_sweep(input_data, grids, model.models)
+        labels = [SWEEP_RANGES[feature][0] for feature in features]
+        
+        if len(grids) == 1:
+            fig = px.line(
+                x=grids[0][1], y=result['predicted_score'], markers=True,
+                labels={'x': labels[0], 'y': 'Predicted Score'},
+                title=f"Predicted Score by {labels[0]}"
+            )
+        else:
+            fig = px.imshow(
+                result['predicted_score'], x=grids[1][1], y=grids[0][1],
+                labels={'x': labels[1], 'y': labels[0], 'color': 'Predicted Score'},
+                origin='lower', aspect='auto', color_continuous_scale='RdYlGn',
+                title=f"Predicted Score by {labels[0]} and {labels[1]}"
+            )
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{result['points']} scenarios evaluated in one model call")